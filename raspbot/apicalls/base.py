@@ -1,3 +1,4 @@
+import time
 from http import HTTPStatus
 
 import aiohttp
@@ -5,6 +6,8 @@ from dotenv import load_dotenv
 
 from raspbot.core import exceptions as exc
 from raspbot.core.logging import configure_logging, log
+from raspbot.core.metrics import metrics
+from raspbot.db.base import commit_current_scope
 
 load_dotenv()
 
@@ -33,7 +36,9 @@ async def get_response(
     """
     if headers["Authorization"] is None:
         raise exc.EmptyHeadersError("No authorization key in the headers.")
+    await commit_current_scope()
     async with aiohttp.ClientSession() as session:
+        start_time = time.perf_counter()
         try:
             logger.info(f"Sending request to {endpoint}.")
             response = await session.get(url=endpoint, headers=headers)
@@ -44,10 +49,14 @@ async def get_response(
                     f"{HTTPStatus(response.status).phrase}. "
                 )
         except Exception as e:
+            metrics.counter("api.request_errors").inc()
             raise exc.APIConnectionError(
                 f"Error connecting to {endpoint}. "
                 f"Headers: {headers}. Error description: {e}"
             ) from e
         else:
+            metrics.histogram("api.request_seconds").observe(
+                time.perf_counter() - start_time
+            )
             logger.info(f"Request to {endpoint} has been successul, response received.")
             return await response.json(content_type=None)
@@ -4,6 +4,11 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.client.telegram import TEST
 
+from raspbot.bot.middlewares import (
+    CommitScopeRequestMiddleware,
+    DBSessionMiddleware,
+    UserMiddleware,
+)
 from raspbot.bot.routes.handlers import router as routes_router
 from raspbot.bot.start.handlers import router as start_router
 from raspbot.bot.timetable.handlers import router as timetable_router
@@ -22,13 +27,22 @@ def get_bot(test: bool = False) -> Bot:
     main_bot = Bot(token=settings.TELEGRAM_TOKEN)
     test_bot = Bot(token=settings.TELEGRAM_TESTENV_TOKEN, session=custom_session)
     bot = test_bot if test else main_bot
+    bot.session.middleware(CommitScopeRequestMiddleware())
     return bot
 
 
-async def start_bot(bot: Bot, handle_signals: bool = True):
-    """Starts the bot."""
+def get_dispatcher() -> Dispatcher:
+    """Returns the dispatcher with the middlewares and all the routers."""
     dp = Dispatcher()
+    dp.update.outer_middleware(DBSessionMiddleware())
+    dp.update.outer_middleware(UserMiddleware())
     dp.include_routers(users_router, start_router, routes_router, timetable_router)
+    return dp
+
+
+async def start_bot(bot: Bot, handle_signals: bool = True):
+    """Starts the bot."""
+    dp = get_dispatcher()
 
     await bot.delete_webhook(drop_pending_updates=True)
 
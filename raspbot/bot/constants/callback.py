@@ -6,9 +6,14 @@ NEW_SEARCH = "new_search"
 
 
 class MorePointCunksCallbackFactory(CallbackData, prefix="more_point_chunks"):
-    """More point chunks callback factory."""
+    """More point chunks callback factory.
+
+    The chunk is the number of the point chunk to be shown, the points are
+    re-selected by the search query kept in the state user data.
+    """
 
     is_departure: bool
+    chunk: int
 
 
 class MyPointCallbackFactory(CallbackData, prefix="mypoint"):
@@ -48,7 +48,10 @@ class SinglePointFound:
         return f"Пункт {dep_or_dest} - {type_} {title}, {region}."
 
 
-INPUT_DEPARTURE_POINT = "Введите пункт отправления (город или станцию):"
+INPUT_DEPARTURE_POINT = (
+    "Введите пункт отправления (город или станцию) "
+    "или отправьте свою геопозицию, чтобы выбрать одну из ближайших станций:"
+)
 INPUT_TOO_SHORT = "Для поиска необходимо ввести как минимум два символа."
 POINT_NOT_FOUND = "Не найдено такой станции или города. Попробуйте ввести по-другому."
 MISSING_POINT = (
@@ -64,6 +67,16 @@ MULTIPLE_POINTS_FOUND = (
 )
 MORE_POINT_CHOICES = "Вот ещё варианты:"
 INPUT_DESTINATION_POINT = "Теперь введите пункт назначения (город или станцию):"
+NEAREST_STATIONS_FOUND = (
+    "Вот ближайшие к вам станции, от ближней к дальней.\n"
+    "Выберите нужную станцию из списка ниже, если она есть. "
+    "Если нужной вам станции нет - нажмите кнопку "
+    f'"<b>{clean_text(btn.MY_POINT_IS_NOT_HERE)}</b>".'
+)
+NO_NEAREST_STATIONS = (
+    "Рядом с вами не найдено ни одной станции. "
+    "Попробуйте ввести название города или станции."
+)
 
 
 # TIMETABLE
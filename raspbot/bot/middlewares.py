@@ -0,0 +1,186 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import Chat, TelegramObject, Update, User
+from sqlalchemy.exc import SQLAlchemyError
+
+from raspbot.bot.constants import callback as clb
+from raspbot.bot.constants import messages as msg
+from raspbot.bot.start.keyboards import back_to_start_keyboard
+from raspbot.core import exceptions as exc
+from raspbot.core.email import send_email_async
+from raspbot.core.logging import configure_logging
+from raspbot.core.metrics import metrics
+from raspbot.db.base import (
+    commit_current_scope,
+    get_statement_count,
+    rollback_current_scope,
+    session_scope,
+)
+from raspbot.services.user_cache import resolve_user
+from raspbot.settings import settings
+
+logger = configure_logging(name=__name__)
+
+STATEMENT_COUNT_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50)
+
+# The flows of the bot, the metric names are only made of these
+KNOWN_COMMANDS = frozenset(("/start", "/search", "/recent", "/fav"))
+KNOWN_CALLBACK_PREFIXES = frozenset(
+    (
+        clb.START,
+        clb.NEW_SEARCH,
+        clb.MORE_RECENTS_TO_FAV,
+        clb.FAVS_FOR_DELETION,
+        clb.SAME_DEPARTURE,
+        *(
+            factory.__prefix__
+            for factory in (
+                clb.MorePointCunksCallbackFactory,
+                clb.MyPointCallbackFactory,
+                clb.MissingPointCallbackFactory,
+                clb.PointsCallbackFactory,
+                clb.GetTimetableCallbackFactory,
+                clb.RouteToFavCallbackFactory,
+                clb.RecentToFavCallbackFactory,
+                clb.AllRecentToFavCallbackFactory,
+                clb.DeleteFavCallbackFactory,
+                clb.DepartureUIDCallbackFactory,
+                clb.EndOfTheDayTimetableCallbackFactory,
+                clb.TomorrowTimetableCallbackFactory,
+                clb.OtherDateTimetableCallbackFactory,
+            )
+        ),
+    )
+)
+OTHER_FLOW = "other"
+
+
+def get_flow(event: TelegramObject) -> str:
+    """Names the flow of the update for the metrics.
+
+    The command for the commands, the callback data prefix for the button clicks.
+    The unknown commands and callback data, which any user can send, are all
+    named OTHER_FLOW, so that they never add metrics to the registry.
+    """
+    if not isinstance(event, Update):
+        return type(event).__name__
+    if event.message is not None:
+        if event.message.location is not None:
+            return "location"
+        text = event.message.text or ""
+        if text.startswith("/"):
+            command = text.split(maxsplit=1)[0].split("@")[0]
+            return command if command in KNOWN_COMMANDS else OTHER_FLOW
+        return "message"
+    if event.callback_query is not None:
+        prefix = (event.callback_query.data or "").split(":", maxsplit=1)[0]
+        return prefix if prefix in KNOWN_CALLBACK_PREFIXES else OTHER_FLOW
+    return event.event_type
+
+
+class DBSessionMiddleware(BaseMiddleware):
+    """Opens one DB session per update.
+
+    The services and CRUD classes called by the handlers use this session,
+    which is committed after the handler, or rolled back if it raises.
+    The work done before a Bot API request is committed before the request,
+    see CommitScopeRequestMiddleware.
+    The session is also available to the handlers as the 'session' argument.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Runs the handler within a DB session scope.
+
+        Records the number of the statements run for the update, by flow.
+        """
+        async with session_scope() as session:
+            data["session"] = session
+            try:
+                return await handler(event, data)
+            finally:
+                self._record_statement_count(event, get_statement_count())
+
+    @staticmethod
+    def _record_statement_count(event: TelegramObject, statements: int) -> None:
+        """Records the statement count and warns if it is over the budget."""
+        flow = get_flow(event)
+        metrics.histogram(
+            f"db.statements_per_update.{flow}", STATEMENT_COUNT_BUCKETS
+        ).observe(statements)
+        if statements > settings.DB_STATEMENTS_PER_UPDATE_BUDGET:
+            metrics.counter("db.updates_over_statement_budget").inc()
+            logger.warning(
+                f"Update of flow {flow} has run {statements} DB statements, "
+                f"over the budget of {settings.DB_STATEMENTS_PER_UPDATE_BUDGET}."
+            )
+
+
+class UserMiddleware(BaseMiddleware):
+    """Resolves the user of the update once, creating it on first contact.
+
+    The user is passed to the handlers as the 'user' argument, along with
+    the 'new_user' boolean. Must be registered after DBSessionMiddleware.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        """Adds the user to the handler data."""
+        tg_user: User | None = data.get("event_from_user")
+        if tg_user is not None:
+            try:
+                data["user"], data["new_user"] = await resolve_user(tg_user=tg_user)
+            except (SQLAlchemyError, exc.SQLError, exc.DBError) as e:
+                logger.exception(e)
+                await rollback_current_scope()
+                await self._answer_error(bot=data["bot"], chat=data.get("event_chat"))
+                await send_email_async(e)
+                raise
+            if data["new_user"]:
+                logger.info(
+                    f"New user detected: {tg_user.full_name}, "
+                    f"telegram id = {tg_user.id}. Added to DB."
+                )
+        return await handler(event, data)
+
+    @staticmethod
+    async def _answer_error(bot: Bot, chat: Chat | None) -> None:
+        """Tells the user that the update cannot be handled."""
+        if chat is None:
+            return
+        await bot.send_message(
+            chat_id=chat.id, text=msg.ERROR, reply_markup=back_to_start_keyboard()
+        )
+
+
+class CommitScopeRequestMiddleware(BaseRequestMiddleware):
+    """Commits the DB work of the update before every Bot API request.
+
+    So that no pooled connection or row lock is held while waiting
+    for Telegram. Registered on the bot session.
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        """Commits the current session scope, if any, and makes the request."""
+        await commit_current_scope()
+        return await make_request(bot, method)
@@ -10,16 +10,13 @@ from raspbot.bot.constants import states
 from raspbot.bot.routes import utils
 from raspbot.bot.routes.keyboards import get_point_choice_keyboard
 from raspbot.bot.start.keyboards import back_to_start_keyboard
-from raspbot.bot.start.utils import get_command_user
 from raspbot.bot.timetable.utils import process_timetable_callback
-from raspbot.core import exceptions as exc
 from raspbot.core.email import send_email_async
 from raspbot.core.logging import configure_logging
-from raspbot.db.models import UserORM
 from raspbot.db.routes.schema import PointResponsePD, RouteResponsePD
-from raspbot.services.routes import PointRetriever, RouteFinder
+from raspbot.db.users.schema import UserSnapshot
+from raspbot.services.routes import PointRetriever, PointSelector, RouteFinder
 from raspbot.services.timetable import Timetable
-from raspbot.services.users import get_user_from_db_or_raise
 from raspbot.settings import settings
 
 logger = configure_logging(name=__name__)
@@ -33,8 +30,6 @@ route_finder = RouteFinder()
 @router.message(Command("search"))
 async def search_command(message: types.Message, state: FSMContext):
     """User: issues /search command. Bot: please input the departure point."""
-    await get_command_user(command="search", message=message)
-
     await message.answer(
         text=msg.INPUT_DEPARTURE_POINT, reply_markup=back_to_start_keyboard()
     )
@@ -60,6 +55,28 @@ async def new_search_callback(callback: types.CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+@router.message(states.RouteState.selecting_departure_point, F.location)
+async def select_nearest_departure(message: types.Message):
+    """User: sends their location. Bot: here are the nearest stations."""
+    assert message.from_user
+    logger.info(
+        f"User {message.from_user.full_name} TGID {message.from_user.id} sent their "
+        "location to select the departure point. Searching for the nearest stations."
+    )
+    await utils.select_nearest_point(is_departure=True, message=message)
+
+
+@router.message(states.RouteState.selecting_destination_point, F.location)
+async def select_nearest_destination(message: types.Message):
+    """User: sends their location. Bot: here are the nearest stations."""
+    assert message.from_user
+    logger.info(
+        f"User {message.from_user.full_name} TGID {message.from_user.id} sent their "
+        "location to select the destination point. Searching for the nearest stations."
+    )
+    await utils.select_nearest_point(is_departure=False, message=message)
+
+
 @router.message(states.RouteState.selecting_departure_point)
 async def select_departure(message: types.Message, state: FSMContext):
     """User: inputs the desired departure point. Bot: here's what I have in the DB."""
@@ -91,39 +108,55 @@ async def more_buttons_handler(
     """User: clicks the 'more' button. Bot: here's the next set of points."""
     logger.info(
         f"User {callback.from_user.full_name} TGID {callback.from_user.id} clicked on "
-        "the 'More points' inline button. Getting the remaining points from the state "
-        "user data and replying to the user."
+        "the 'More points' inline button. Re-selecting the points by the search query "
+        "from the state user data and replying to the user."
     )
     user_data: dict[str, Any] = await state.get_data()
 
     assert isinstance(callback.message, types.Message)
-    try:
-        point_chunks: list[list[PointResponsePD]] = user_data["remaining_point_chunks"]
-    except KeyError as e:
-        logger.exception(e)
+    search_query: str | None = user_data.get(
+        utils.get_search_query_key(is_departure=callback_data.is_departure)
+    )
+    point_chunks: list[list[PointResponsePD]] | None = None
+    if search_query:
+        try:
+            point_chunks = await PointSelector().select_points(
+                raw_user_input=search_query
+            )
+        except Exception as e:
+            logger.exception(e)
+            await callback.message.answer(
+                text=msg.ERROR, reply_markup=back_to_start_keyboard()
+            )
+            await send_email_async(e)
+            return
+
+    if not point_chunks or callback_data.chunk >= len(point_chunks):
+        # The state has been reset or the station data has changed since
+        logger.warning(
+            f"Point chunk {callback_data.chunk} for the search query '{search_query}' "
+            "is not available."
+        )
         await callback.message.answer(
-            text=msg.ERROR, reply_markup=back_to_start_keyboard()
+            text=msg.POINT_NOT_FOUND, reply_markup=back_to_start_keyboard()
         )
-        await send_email_async(e)
-
-    points: list = point_chunks.pop(0)
+        await callback.answer()
+        return
 
+    logger.debug(
+        f"Replying with point chunk {callback_data.chunk} "
+        f"out of {len(point_chunks)} chunks."
+    )
     await callback.message.answer(
         msg.MORE_POINT_CHOICES,
         reply_markup=get_point_choice_keyboard(
-            points=points,
+            points=point_chunks[callback_data.chunk],
             is_departure=callback_data.is_departure,
-            last_chunk=not point_chunks,
+            last_chunk=callback_data.chunk == len(point_chunks) - 1,
+            chunk=callback_data.chunk,
         ),
     )
 
-    logger.debug("Updating the state user data with remanining point chunks.")
-    await state.update_data(remaining_point_chunks=point_chunks)
-    logger.debug(
-        "Amount of remaining chunks in the state user data is "
-        f"{len(user_data['remaining_point_chunks'])} chunks."
-    )
-
     await callback.answer()
 
 
@@ -204,6 +237,7 @@ async def choose_destination_from_multiple_callback(
     callback: types.CallbackQuery,
     callback_data: clb.PointsCallbackFactory,
     state: FSMContext,
+    user: UserSnapshot,
 ):
     """User: selects the destination from the list. Bot: here's the timetable."""
     assert isinstance(callback.message, types.Message)
@@ -237,17 +271,6 @@ async def choose_destination_from_multiple_callback(
             text=msg.ERROR, reply_markup=back_to_start_keyboard()
         )
 
-    try:
-        user: UserORM = await get_user_from_db_or_raise(
-            telegram_id=callback.from_user.id
-        )
-    except exc.NotFoundError as e:
-        logger.exception(e)
-        await send_email_async(e)
-        await callback.message.answer(
-            text=msg.ERROR, reply_markup=back_to_start_keyboard()
-        )
-
     logger.info(
         f"Getting or creating a route between {departure_point.title} and "
         f"{selected_point.title} in DB."
@@ -269,4 +292,5 @@ async def choose_destination_from_multiple_callback(
         callback=callback,
         state=state,
         timetable_obj=timetable_obj,
+        user=user,
     )
@@ -13,7 +13,10 @@ logger = configure_logging(__name__)
 
 @log(logger)
 def get_point_choice_keyboard(
-    points: list[PointResponsePD], is_departure: bool, last_chunk: bool = True
+    points: list[PointResponsePD],
+    is_departure: bool,
+    last_chunk: bool = True,
+    chunk: int = 0,
 ) -> types.InlineKeyboardMarkup:
     """Keyboard listing potential points matching the search pattern."""
     builder = InlineKeyboardBuilder()
@@ -30,7 +33,9 @@ def get_point_choice_keyboard(
     if not last_chunk:
         builder.button(
             text=btn.MORE_POINT_CHOICES,
-            callback_data=clb.MorePointCunksCallbackFactory(is_departure=is_departure),
+            callback_data=clb.MorePointCunksCallbackFactory(
+                is_departure=is_departure, chunk=chunk + 1
+            ),
         )
     else:
         builder.button(
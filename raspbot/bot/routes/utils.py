@@ -16,6 +16,11 @@ from raspbot.services.routes import PointSelector
 logger = configure_logging(__name__)
 
 
+def get_search_query_key(is_departure: bool) -> str:
+    """Returns the state user data key of the departure / destination search query."""
+    return "departure_search_query" if is_departure else "destination_search_query"
+
+
 @log(logger)
 async def select_point(is_departure: bool, message: types.Message, state: FSMContext):
     """Base function for the departure / destination point selection."""
@@ -40,26 +45,21 @@ async def select_point(is_departure: bool, message: types.Message, state: FSMCon
             text=msg.POINT_NOT_FOUND, reply_markup=back_to_start_keyboard()
         )
     elif len(point_chunks) > 1 or len(point_chunks[0]) > 1:
-        logger.debug(f"Number of point chunks before pop: {len(point_chunks)}.")
-        points: list = point_chunks.pop(0)
-        logger.debug(f"First point chunk popped, its length is {len(points)} elements.")
-        logger.debug(f"Number of point chunks after pop is {len(point_chunks)} chunks.")
-        logger.debug(
-            f"Bool value of last chunk given to keyboard is {not point_chunks}."
-        )
+        logger.debug(f"Number of point chunks: {len(point_chunks)}.")
         await message.answer(
             msg.MULTIPLE_POINTS_FOUND,
             reply_markup=get_point_choice_keyboard(
-                points=points, is_departure=is_departure, last_chunk=not point_chunks
+                points=point_chunks[0],
+                is_departure=is_departure,
+                last_chunk=len(point_chunks) == 1,
             ),
             parse_mode="HTML",
         )
-        logger.debug("Updating the state user data with remanining point chunks.")
-        await state.update_data(remaining_point_chunks=point_chunks)
-        user_data: dict = await state.get_data()
         logger.debug(
-            "Amount of remaining chunks in the state user data is "
-            f"{len(user_data['remaining_point_chunks'])} chunks."
+            "Updating the state user data with the search query for the next chunks."
+        )
+        await state.update_data(
+            {get_search_query_key(is_departure=is_departure): message.text}
         )
     else:
         point = point_chunks[0][0]
@@ -70,3 +70,34 @@ async def select_point(is_departure: bool, message: types.Message, state: FSMCon
                 point=point, is_departure=is_departure
             ),
         )
+
+
+@log(logger)
+async def select_nearest_point(is_departure: bool, message: types.Message):
+    """Base function for the departure / destination point selection by location."""
+    assert message.location
+    point_selector = PointSelector()
+
+    try:
+        points: list[PointResponsePD] | None = point_selector.select_nearest_stations(
+            latitude=message.location.latitude, longitude=message.location.longitude
+        )
+    except Exception as e:
+        logger.exception(e)
+        await message.answer(text=msg.ERROR, reply_markup=back_to_start_keyboard())
+        await send_email_async(e)
+        return
+
+    if not points:
+        await message.answer(
+            text=msg.NO_NEAREST_STATIONS, reply_markup=back_to_start_keyboard()
+        )
+        return
+
+    await message.answer(
+        msg.NEAREST_STATIONS_FOUND,
+        reply_markup=get_point_choice_keyboard(
+            points=points, is_departure=is_departure
+        ),
+        parse_mode="HTML",
+    )
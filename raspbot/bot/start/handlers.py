@@ -5,8 +5,9 @@ from aiogram.fsm.context import FSMContext
 from raspbot.bot.constants import callback as clb
 from raspbot.bot.constants import messages as msg
 from raspbot.bot.start.keyboards import start_keyboard
-from raspbot.bot.start.utils import get_command_user
+from raspbot.bot.start.utils import answer_new_user
 from raspbot.core.logging import configure_logging
+from raspbot.db.users.schema import UserSnapshot
 
 logger = configure_logging(name=__name__)
 
@@ -14,19 +15,17 @@ router = Router()
 
 
 @router.message(Command("start"))
-async def start_command(message: types.Message):
+async def start_command(message: types.Message, user: UserSnapshot, new_user: bool):
     """User: issues /start command. Bot: please input the departure point."""
-    assert message.from_user
-    user, new_user = await get_command_user(
-        command="start",
-        message=message,
-        reply_text=msg.GREETING_NEW_USER.format(
-            first_name=message.from_user.first_name
-        ),
-        reply_markup=start_keyboard,
-    )
-
-    if not new_user:
+    if new_user:
+        await answer_new_user(
+            command="start",
+            message=message,
+            user=user,
+            reply_text=msg.GREETING_NEW_USER.format(first_name=user.first_name),
+            reply_markup=start_keyboard,
+        )
+    else:
         logger.info(
             f"User {user.full_name} TGID {user.telegram_id} issued a /start command. "
             "Greeting existing user."
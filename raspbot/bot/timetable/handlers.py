@@ -12,6 +12,7 @@ from raspbot.core import exceptions as exc
 from raspbot.core.email import send_email_async
 from raspbot.core.logging import configure_logging
 from raspbot.db.models import RecentORM, RouteORM
+from raspbot.db.users.schema import UserSnapshot
 from raspbot.services.deptime import get_uid_by_time
 from raspbot.services.other_date import get_timetable_by_date
 from raspbot.services.routes import RouteRetriever
@@ -31,6 +32,7 @@ async def show_closest_departures_callback(
     callback: types.CallbackQuery,
     callback_data: clb.GetTimetableCallbackFactory,
     state: FSMContext,
+    user: UserSnapshot,
 ):
     """User: selects the route from the list. Bot: here's the timetable.
 
@@ -38,9 +40,7 @@ async def show_closest_departures_callback(
     """
     try:
         recent: RecentORM = await update_recent(recent_id=callback_data.recent_id)
-        route: RouteORM = await route_retriever.get_route_from_db(
-            route_id=recent.route_id
-        )
+        route: RouteORM = recent.route
     # Exception includes the most common NoDBObjectError exception
     except Exception as e:
         logger.exception(e)
@@ -61,7 +61,7 @@ async def show_closest_departures_callback(
         "Now replying to the user with this timetable."
     )
     await utils.process_timetable_callback(
-        callback=callback, state=state, timetable_obj=timetable_obj
+        callback=callback, state=state, timetable_obj=timetable_obj, user=user
     )
 
 
@@ -120,6 +120,7 @@ async def show_till_the_end_of_the_day_callback(
     callback: types.CallbackQuery,
     callback_data: clb.EndOfTheDayTimetableCallbackFactory,
     state: FSMContext,
+    user: UserSnapshot,
 ):
     """User: clicks on the button to see full timetable for today. Bot: here you go.
 
@@ -157,7 +158,7 @@ async def show_till_the_end_of_the_day_callback(
         f"route {timetable_obj.route} for today. Replying with full timetable."
     )
     await utils.process_timetable_callback(
-        callback=callback, state=state, timetable_obj=timetable_obj
+        callback=callback, state=state, timetable_obj=timetable_obj, user=user
     )
 
 
@@ -209,6 +210,7 @@ async def show_tomorrow_timetable_callback(
     callback: types.CallbackQuery,
     callback_data: clb.TomorrowTimetableCallbackFactory,
     state: FSMContext,
+    user: UserSnapshot,
 ):
     """User: clicks on the button to see timetable for tomorrow. Bot: here you go.
 
@@ -235,7 +237,7 @@ async def show_tomorrow_timetable_callback(
         f"route {timetable_obj.route} for tomorrow. Replying with the timetable."
     )
     await utils.process_timetable_callback(
-        callback=callback, state=state, timetable_obj=timetable_obj
+        callback=callback, state=state, timetable_obj=timetable_obj, user=user
     )
 
 
@@ -277,7 +279,9 @@ async def show_other_date_timetable_callback(
 
 
 @router.message(states.TimetableState.other_date)
-async def select_date_timetable_by_text(message: types.Message, state: FSMContext):
+async def select_date_timetable_by_text(
+    message: types.Message, state: FSMContext, user: UserSnapshot
+):
     """User: types an arbitrary date. Bot: here's the timetable for this date.
 
     Current state: TimetableState:other_date
@@ -300,7 +304,7 @@ async def select_date_timetable_by_text(message: types.Message, state: FSMContex
         timetable_obj = get_timetable_by_date(
             route=route, user_raw_date_input=message.text
         )
-        await utils.process_timetable_message(message, state, timetable_obj)
+        await utils.process_timetable_message(message, state, timetable_obj, user)
     except exc.InvalidDataError as e:
         await message.answer(
             text=str(e), reply_markup=back_to_start_keyboard(), parse_mode="HTML"
@@ -9,18 +9,18 @@ from raspbot.bot.constants import states
 from raspbot.bot.start.keyboards import back_to_start_keyboard
 from raspbot.bot.timetable import keyboards as kb
 from raspbot.core import exceptions as exc
-from raspbot.core.email import send_email_async
 from raspbot.core.logging import configure_logging
-from raspbot.db.models import RouteORM, UserORM
+from raspbot.db.models import RouteORM
 from raspbot.db.routes.schema import RouteResponsePD, ThreadResponsePD
+from raspbot.db.users.schema import UserSnapshot
 from raspbot.services.timetable import ThreadInfo, Timetable
-from raspbot.services.users import get_recent_by_route, get_user_from_db_or_raise
+from raspbot.services.users import get_recent_by_route
 
 logger = configure_logging(name=__name__)
 
 
 async def _route_is_in_user_fav(
-    route: RouteORM | RouteResponsePD, user: UserORM
+    route: RouteORM | RouteResponsePD, user: UserSnapshot
 ) -> bool:
     """Check if the route is in the user's favorite routes."""
     try:
@@ -33,7 +33,7 @@ async def _route_is_in_user_fav(
 
 
 async def _answer_with_timetable(
-    timetable_obj: Timetable, message: types.Message, user: UserORM
+    timetable_obj: Timetable, message: types.Message, user: UserSnapshot
 ) -> None:
     """Answers the message with the provided Timetable object."""
     try:
@@ -78,18 +78,9 @@ async def process_timetable_callback(
     callback: types.CallbackQuery,
     state: FSMContext,
     timetable_obj: Timetable,
+    user: UserSnapshot,
 ):
     """Answers the callback based on the provided Timetable object."""
-    try:
-        user = await get_user_from_db_or_raise(callback.from_user.id)
-    except Exception as e:
-        logger.exception(e)
-        await send_email_async(e)
-        assert isinstance(callback.message, types.Message)
-        await callback.message.answer(
-            text=msg.ERROR, reply_markup=back_to_start_keyboard()
-        )
-
     assert isinstance(callback.message, types.Message)
 
     await _answer_with_timetable(timetable_obj, callback.message, user)
@@ -107,16 +98,9 @@ async def process_timetable_message(
     message: types.Message,
     state: FSMContext,
     timetable_obj: Timetable,
+    user: UserSnapshot,
 ):
     """Answers the message based on the provided Timetable object."""
-    try:
-        assert message.from_user
-        user = await get_user_from_db_or_raise(message.from_user.id)
-    except Exception as e:
-        logger.exception(e)
-        await send_email_async(e)
-        await message.answer(text=msg.ERROR, reply_markup=back_to_start_keyboard())
-
     await _answer_with_timetable(timetable_obj, message, user)
     await state.set_state(states.TimetableState.exact_departure_info)
     await state.update_data(timetable_obj=timetable_obj)
@@ -5,24 +5,25 @@ from aiogram.fsm.context import FSMContext
 from raspbot.bot.constants import callback as clb
 from raspbot.bot.constants import messages as msg
 from raspbot.bot.start.keyboards import back_to_start_keyboard, start_keyboard
-from raspbot.bot.start.utils import get_command_user
+from raspbot.bot.start.utils import answer_new_user
 from raspbot.bot.users.keyboards import (
     add_recent_to_fav_keyboard,
     get_fav_keyboard,
     get_recent_keyboard,
 )
-from raspbot.core import exceptions as exc
 from raspbot.core.email import send_email_async
 from raspbot.core.logging import configure_logging
 from raspbot.db.models import RouteORM
+from raspbot.db.users.schema import UserSnapshot
 from raspbot.services.routes import RouteRetriever
 from raspbot.services.users import (
     add_recent_to_fav,
+    add_recents_to_fav,
     delete_recent_from_fav,
     get_recent_by_route,
     get_user_fav,
-    get_user_from_db_or_raise,
     get_user_recent,
+    get_user_recent_not_in_fav,
 )
 
 logger = configure_logging(name=__name__)
@@ -33,14 +34,16 @@ route_retriever = RouteRetriever()
 
 
 @router.message(Command("recent"))
-async def recent_command(message: types.Message):
+async def recent_command(message: types.Message, user: UserSnapshot, new_user: bool):
     """User: issues /recent command. Bot: lists recents or advises otherwise."""
-    user, _ = await get_command_user(
-        command="recent",
-        message=message,
-        reply_text=msg.NO_RECENT,
-        reply_markup=start_keyboard,
-    )
+    if new_user:
+        await answer_new_user(
+            command="recent",
+            message=message,
+            user=user,
+            reply_text=msg.NO_RECENT,
+            reply_markup=start_keyboard,
+        )
 
     try:
         user_recent = await get_user_recent(user=user)
@@ -70,12 +73,8 @@ async def recent_command(message: types.Message):
 
 
 @router.message(Command("fav"))
-async def fav_command(message: types.Message):
+async def fav_command(message: types.Message, user: UserSnapshot):
     """User: issues /fav command. Bot: lists favs or advises otherwise."""
-    user, _ = await get_command_user(
-        command="fav",
-        message=message,
-    )
 
     try:
         user_recent = await get_user_recent(user=user)
@@ -140,32 +139,13 @@ async def add_route_to_fav_callback(
     callback: types.CallbackQuery,
     callback_data: clb.RouteToFavCallbackFactory,
     state: FSMContext,
+    user: UserSnapshot,
 ):
     """User: clicks on the 'add to fav' button. Bot: added to favorites."""
-    tg_user_id = callback.from_user.id
-
-    assert isinstance(callback.message, types.Message)
-    try:
-        user = await get_user_from_db_or_raise(telegram_id=tg_user_id)
-    except exc.NotFoundError as e:
-        text = (
-            f"User {callback.from_user.full_name} TGID {callback.from_user.id} "
-            f"was not found in the database. Route with ID {callback_data.route_id} "
-            "cannot be added to favorites."
-        )
-        logger.error(text)
-        await send_email_async(e)
-        await callback.message.answer(msg.ERROR, reply_markup=back_to_start_keyboard())
-        return
-    except Exception as e:
-        logger.exception(e)
-        await send_email_async(e)
-        await callback.message.answer(msg.ERROR, reply_markup=back_to_start_keyboard())
-        return
-
     recent = await get_recent_by_route(user_id=user.id, route_id=callback_data.route_id)
     fav = await add_recent_to_fav(recent_id=recent.id)
-    route = await route_retriever.get_route_from_db(route_id=fav.route_id)
+    # The recent is returned with its route and both route points
+    route = fav.route
 
     logger.info(
         f"User {user.full_name} TGID {user.telegram_id} "
@@ -203,13 +183,14 @@ async def add_recent_to_fav_callback(
 
 @router.callback_query(clb.AllRecentToFavCallbackFactory.filter())
 async def add_all_recent_to_fav_callback(
-    callback: types.CallbackQuery, callback_data: clb.AllRecentToFavCallbackFactory
+    callback: types.CallbackQuery,
+    callback_data: clb.AllRecentToFavCallbackFactory,
+    user: UserSnapshot,
 ):
     """User: clicks on the 'add all to fav' button. Bot: added to favorites."""
-    recent_ids = callback_data.recent_ids.split(sep="_")
-    for recent_id in recent_ids:
-        await add_recent_to_fav(recent_id=int(recent_id))
-    msg_text = str(msg.MultipleToFav(amount=len(recent_ids)))
+    recent_ids = [int(recent_id) for recent_id in callback_data.recent_ids.split("_")]
+    added = await add_recents_to_fav(user=user, recent_ids=recent_ids)
+    msg_text = str(msg.MultipleToFav(amount=added))
 
     logger.info(
         f"User {callback.from_user.full_name} TGID {callback.from_user.id} "
@@ -221,23 +202,12 @@ async def add_all_recent_to_fav_callback(
 
 
 @router.callback_query(F.data == clb.MORE_RECENTS_TO_FAV)
-async def add_more_recents_to_fav_callback(callback: types.CallbackQuery):
+async def add_more_recents_to_fav_callback(
+    callback: types.CallbackQuery, user: UserSnapshot
+):
     """User: clicks on the 'add more to fav' button. Bot: pick recents."""
-    tg_user_id = callback.from_user.id
-
     assert isinstance(callback.message, types.Message)
-    try:
-        user = await get_user_from_db_or_raise(telegram_id=tg_user_id)
-    except Exception as e:
-        logger.exception(e)
-        await send_email_async(e)
-        await callback.message.answer(msg.ERROR, reply_markup=back_to_start_keyboard())
-        return
-
-    recents = await get_user_recent(user=user)
-    favs = await get_user_fav(user=user)
-    fav_ids = [fav.id for fav in favs]
-    recents_not_in_favs = [recent for recent in recents if recent.id not in fav_ids]
+    recents_not_in_favs = await get_user_recent_not_in_fav(user=user)
 
     if not recents_not_in_favs:
         text = (
@@ -258,17 +228,9 @@ async def add_more_recents_to_fav_callback(callback: types.CallbackQuery):
 
 
 @router.callback_query(F.data == clb.FAVS_FOR_DELETION)
-async def favs_for_deletion_callback(callback: types.CallbackQuery):
+async def favs_for_deletion_callback(callback: types.CallbackQuery, user: UserSnapshot):
     """User: clicks the 'delete favs' button. Bot: select favs to be deleted."""
     assert isinstance(callback.message, types.Message)
-    try:
-        user = await get_user_from_db_or_raise(telegram_id=callback.from_user.id)
-    except Exception as e:
-        logger.exception(e)
-        await send_email_async(e)
-        await callback.message.answer(msg.ERROR, reply_markup=back_to_start_keyboard())
-        return
-
     logger.info(
         f"User {user.full_name} TGID {user.telegram_id} clicked on "
         "the 'Delete Favs' inline button. Replying."
@@ -292,14 +254,15 @@ async def favs_for_deletion_callback(callback: types.CallbackQuery):
 
 @router.callback_query(clb.DeleteFavCallbackFactory.filter())
 async def delete_fav_callback(
-    callback: types.CallbackQuery, callback_data: clb.DeleteFavCallbackFactory
+    callback: types.CallbackQuery,
+    callback_data: clb.DeleteFavCallbackFactory,
+    user: UserSnapshot,
 ):
     """User: clicks on the route button. Bot: deleted from favorites."""
     fav_id = callback_data.recent_id
     assert isinstance(callback.message, types.Message)
 
     try:
-        user = await get_user_from_db_or_raise(telegram_id=callback.from_user.id)
         recent = await delete_recent_from_fav(recent_id=fav_id)
     except Exception as e:
         logger.exception(e)
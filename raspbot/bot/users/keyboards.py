@@ -4,20 +4,20 @@ from aiogram.utils.keyboard import InlineKeyboardBuilder
 from raspbot.bot.constants import buttons as btn
 from raspbot.bot.constants import callback as clb
 from raspbot.core.logging import configure_logging, log
-from raspbot.db.models import RecentORM
+from raspbot.db.users.schema import RecentListItem
 
 logger = configure_logging(name=__name__)
 
 
 @log(logger)
 def get_recent_keyboard(
-    recent_list: list[RecentORM],
+    recent_list: list[RecentListItem],
 ) -> types.InlineKeyboardMarkup:
     """Keyboard for favorite or recent routes."""
     builder = InlineKeyboardBuilder()
     for element in recent_list:
         builder.button(
-            text=element.route.short,  # type: ignore
+            text=element.short,
             callback_data=clb.GetTimetableCallbackFactory(recent_id=element.id),
         )
     builder.button(text=btn.NEW_SEARCH, callback_data=clb.NEW_SEARCH)
@@ -28,7 +28,7 @@ def get_recent_keyboard(
 
 @log(logger)
 def get_fav_keyboard(
-    fav_list: list[RecentORM],
+    fav_list: list[RecentListItem],
     for_deletion: bool = False,
     recents_not_in_fav: bool = False,
 ) -> types.InlineKeyboardMarkup:
@@ -43,7 +43,7 @@ def get_fav_keyboard(
 
     for element in fav_list:
         builder.button(
-            text=element.route.short,  # type: ignore
+            text=element.short,
             callback_data=clb_factory(recent_id=element.id),
         )
     if not for_deletion:
@@ -61,13 +61,13 @@ def get_fav_keyboard(
 
 @log(logger)
 def add_recent_to_fav_keyboard(
-    user_recent: list[RecentORM],
+    user_recent: list[RecentListItem],
 ) -> types.InlineKeyboardMarkup:
     """Keyboard for adding recent routes to favorite."""
     builder = InlineKeyboardBuilder()
     for recent in user_recent:
         builder.button(
-            text=recent.route.short,  # type: ignore
+            text=recent.short,
             callback_data=clb.RecentToFavCallbackFactory(recent_id=recent.id),
         )
     callback_arg = "_".join([str(recent.id) for recent in user_recent])
@@ -32,6 +32,10 @@ class DataStructureError(GetDataError):
     """Raised if there is an error in structuring the initial data."""
 
 
+class DataValidationError(GetDataError):
+    """Raised if the initial data does not pass the sanity checks against the DB."""
+
+
 # SQL
 
 
@@ -51,6 +55,10 @@ class NoDBObjectError(SQLError):
     """Raised if there is no object in the DB."""
 
 
+class NoSessionError(SQLError):
+    """Raised if there is no DB session open in the current context."""
+
+
 # Values
 
 
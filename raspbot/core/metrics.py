@@ -0,0 +1,143 @@
+"""In-process metrics: counters, gauges and histograms.
+
+The metrics are kept in memory and periodically written to the log
+by report_metrics, so that no metrics server is needed.
+"""
+
+import asyncio
+import bisect
+from typing import Callable
+
+from raspbot.core.logging import configure_logging
+from raspbot.settings import settings
+
+logger = configure_logging(name=__name__)
+
+# Seconds, from a fraction of a millisecond to the usual timeouts
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Counter:
+    """Monotonically increasing value, e.g. the number of events."""
+
+    def __init__(self):
+        """Initializes Counter class instance."""
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        """Increases the counter."""
+        self.value += amount
+
+    def snapshot(self) -> int:
+        """Returns the current value."""
+        return self.value
+
+
+class Gauge:
+    """Value read from a callback at the moment of the snapshot."""
+
+    def __init__(self, callback: Callable[[], float]):
+        """Initializes Gauge class instance."""
+        self._callback = callback
+
+    def snapshot(self) -> float:
+        """Returns the current value."""
+        return self._callback()
+
+
+class Histogram:
+    """Distribution of the observed values, e.g. durations in seconds."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        """Initializes Histogram class instance."""
+        self._buckets = buckets
+        # The last count is for the values above the largest bucket
+        self._counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Adds the value to the distribution."""
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimates the quantile as the upper bound of its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket, bucket_count in zip(self._buckets, self._counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bucket
+        return self.max
+
+    def snapshot(self) -> dict[str, float]:
+        """Returns the summary of the distribution."""
+        return {
+            "count": self.count,
+            "avg": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max,
+        }
+
+
+class MetricsRegistry:
+    """Registry of the named metrics.
+
+    The metrics are looked up on every SQL statement and API call,
+    so a metric object is only created when it is missing.
+    """
+
+    def __init__(self):
+        """Initializes MetricsRegistry class instance."""
+        self._counters: dict[str, Counter] = {}
+        self._gauges: dict[str, Gauge] = {}
+        self._histograms: dict[str, Histogram] = {}
+
+    def counter(self, name: str) -> Counter:
+        """Gets or creates the counter."""
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = Counter()
+        return counter
+
+    def gauge(self, name: str, callback: Callable[[], float]) -> Gauge:
+        """Creates the gauge, replacing the existing one with the same name."""
+        gauge = Gauge(callback)
+        self._gauges[name] = gauge
+        return gauge
+
+    def histogram(
+        self, name: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Gets or creates the histogram."""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram(buckets)
+        return histogram
+
+    def snapshot(self) -> dict[str, int | float | dict[str, float]]:
+        """Returns the current values of all the metrics."""
+        snapshot: dict[str, int | float | dict[str, float]] = {}
+        for registry in (self._counters, self._gauges, self._histograms):
+            for name, metric in registry.items():
+                snapshot[name] = metric.snapshot()
+        return snapshot
+
+
+metrics = MetricsRegistry()
+
+
+async def report_metrics(
+    interval_minutes: int = settings.METRICS_LOG_INTERVAL_MINUTES,
+) -> None:
+    """Writes the metrics snapshot to the log every interval_minutes."""
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        logger.info(f"Metrics: {metrics.snapshot()}")
@@ -1,14 +1,42 @@
+import functools
 import logging
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
 
-from sqlalchemy import DateTime, func
-from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
+from sqlalchemy import DateTime, event, func
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio import (
+    AsyncAttrs,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, mapped_column
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    PoolProxiedConnection,
+)
 
+from raspbot.core import exceptions as exc
 from raspbot.core.logging import configure_logging
+from raspbot.core.metrics import metrics
 from raspbot.settings import settings
 
 logger = configure_logging(name="sqlalchemy.engine", level=logging.INFO)
+slow_query_logger = configure_logging(name=__name__)
+
+ReturnType = TypeVar("ReturnType")
+
+# The CRUD method running the statements of the current context
+_current_statement_tag: ContextVar[str] = ContextVar(
+    "current_statement_tag", default="other"
+)
 
 
 class PreBaseORM:
@@ -48,6 +76,274 @@ class BaseORM(AsyncAttrs, DeclarativeBase, PreBaseORM):
     pass
 
 
-engine = create_async_engine(settings.database_url)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Connection pool recording the wait time for a connection."""
+
+    metrics_prefix = "db.pool"
+
+    def connect(self) -> PoolProxiedConnection:
+        start_time = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            metrics.histogram(f"{self.metrics_prefix}.wait_seconds").observe(
+                time.perf_counter() - start_time
+            )
+
+
+class ReplicaInstrumentedPool(InstrumentedPool):
+    """Instrumented connection pool of the read replica."""
+
+    metrics_prefix = "db.replica_pool"
+
+
+def tag_statements(
+    method: Callable[..., Awaitable[ReturnType]],
+) -> Callable[..., Awaitable[ReturnType]]:
+    """Tags the statements run by the CRUD method with its name, e.g. in metrics."""
+
+    @functools.wraps(method)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> ReturnType:
+        token = _current_statement_tag.set(f"{type(self).__name__}.{method.__name__}")
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            _current_statement_tag.reset(token)
+
+    return wrapper
+
+
+def _redact_parameters(parameters: Any) -> Any:
+    """Replaces the statement parameter values with their type names."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany
+            return f"<{len(parameters)} parameter sets>"
+        return tuple(type(value).__name__ for value in parameters)
+    return type(parameters).__name__
+
+
+def _count_statement() -> None:
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.statements += 1
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    conn.info.setdefault("statement_start_times", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    duration = time.perf_counter() - conn.info["statement_start_times"].pop()
+    _count_statement()
+    tag = _current_statement_tag.get()
+    metrics.histogram("db.statement_seconds").observe(duration)
+    metrics.histogram(f"db.statement_seconds.{tag}").observe(duration)
+    if duration >= settings.DB_SLOW_QUERY_SECONDS:
+        metrics.counter("db.slow_statements").inc()
+        slow_query_logger.warning(
+            f"Slow statement of {tag} took {duration:.3f} seconds: {statement} "
+            f"Parameters: {_redact_parameters(parameters)}"
+        )
+
+
+def _handle_error(exception_context: Any) -> None:
+    # The failed statement never reaches after_cursor_execute
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("statement_start_times"):
+        conn.info["statement_start_times"].pop()
+        metrics.counter("db.statement_errors").inc()
+        _count_statement()
+
+
+def _create_engine(url: str, poolclass: type[InstrumentedPool]) -> AsyncEngine:
+    """Creates the engine with the pool configured by the DB_* settings."""
+    new_engine = create_async_engine(
+        url,
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+        },
+    )
+    sync_engine = new_engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+    # The engine replaces its pool on dispose, so the pool is looked up every time
+    def _count_overflow(
+        dbapi_connection: Any, connection_record: ConnectionPoolEntry
+    ) -> None:
+        # The pool counts a new connection in its overflow before opening it
+        if sync_engine.pool.overflow() > 0:
+            metrics.counter(f"{poolclass.metrics_prefix}.overflows").inc()
+
+    event.listen(sync_engine.pool, "connect", _count_overflow)
+    metrics.gauge(
+        f"{poolclass.metrics_prefix}.checked_out",
+        lambda: sync_engine.pool.checkedout(),
+    )
+    # The pool reports a negative overflow until all pool_size connections are open
+    metrics.gauge(
+        f"{poolclass.metrics_prefix}.overflow",
+        lambda: max(sync_engine.pool.overflow(), 0),
+    )
+    return new_engine
+
 
+engine = _create_engine(settings.database_url, InstrumentedPool)
 async_session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+# The optional read replica for the read-only CRUD methods
+read_engine: AsyncEngine | None = None
+async_read_session_factory: async_sessionmaker[AsyncSession] | None = None
+if settings.replica_database_url:
+    read_engine = _create_engine(settings.replica_database_url, ReplicaInstrumentedPool)
+    async_read_session_factory = async_sessionmaker(read_engine, expire_on_commit=False)
+
+
+@dataclass
+class SessionScope:
+    """Sessions of a session_scope."""
+
+    session: AsyncSession
+    read_session: AsyncSession | None = None
+    # Once the primary session has been used, the reads go to the primary too,
+    # so that they see the changes made in the scope
+    primary_used: bool = False
+    replica_failed: bool = False
+    # The number of the statements run in the scope, on either session
+    statements: int = 0
+
+
+_current_scope: ContextVar[SessionScope | None] = ContextVar(
+    "current_scope", default=None
+)
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """Opens a DB session and makes it the current one for the CRUD classes.
+
+    Commits on exit, or rolls back if an exception has been raised.
+    The work done so far is also committed by commit_current_scope before
+    every network call, so that the scope never holds a connection while
+    waiting on the network. Every asyncio task has its own context,
+    so the concurrent scopes (e.g. the concurrent bot updates) never share
+    a session.
+    The read replica session, if any, is opened on the first read.
+    """
+    async with async_session_factory() as session:
+        scope = SessionScope(session=session)
+        token = _current_scope.set(scope)
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            _current_scope.reset(token)
+            if scope.read_session is not None:
+                await scope.read_session.close()
+
+
+async def commit_current_scope() -> None:
+    """Commits the transactions of the enclosing session_scope, if there is one.
+
+    Releases the pooled connections and the row locks before a network call,
+    e.g. to the Bot API or to Yandex. The scope stays usable: the next
+    statement begins a new transaction.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        return
+    if scope.session.in_transaction():
+        await scope.session.commit()
+    if scope.read_session is not None and scope.read_session.in_transaction():
+        await scope.read_session.commit()
+
+
+async def rollback_current_scope() -> None:
+    """Rolls back the transactions of the enclosing session_scope, if there is one.
+
+    For the error paths that still reply to the user: a failed transaction
+    cannot be committed before the Bot API request.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        return
+    await scope.session.rollback()
+    if scope.read_session is not None:
+        await scope.read_session.rollback()
+
+
+def _get_current_scope() -> SessionScope:
+    scope = _current_scope.get()
+    if scope is None:
+        raise exc.NoSessionError(
+            "There is no DB session in the current context. "
+            "DB calls must be made within session_scope."
+        )
+    return scope
+
+
+def get_current_session() -> AsyncSession:
+    """Returns the session opened by the enclosing session_scope."""
+    scope = _get_current_scope()
+    scope.primary_used = True
+    return scope.session
+
+
+def use_primary() -> None:
+    """Sends all the reads of the enclosing session_scope to the primary.
+
+    For the reads that must see the latest writes, even those made
+    outside of the scope, e.g. right after the stations DB population.
+    """
+    _get_current_scope().primary_used = True
+
+
+def get_current_read_session() -> AsyncSession:
+    """Returns the session for the read-only queries of the enclosing session_scope.
+
+    This is the read replica session, unless there is no replica, it has failed
+    or the primary session has already been used in the scope.
+    """
+    scope = _get_current_scope()
+    if async_read_session_factory is None or scope.primary_used or scope.replica_failed:
+        return scope.session
+    if scope.read_session is None:
+        scope.read_session = async_read_session_factory()
+    return scope.read_session
+
+
+def get_statement_count() -> int:
+    """Returns the number of the statements run in the enclosing session_scope."""
+    return _get_current_scope().statements
+
+
+def set_replica_failed() -> None:
+    """Sends the rest of the reads of the enclosing session_scope to the primary."""
+    _get_current_scope().replica_failed = True
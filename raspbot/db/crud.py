@@ -1,13 +1,27 @@
 import abc
-from typing import Type, TypeVar
+import inspect
+from typing import Any, Type, TypeVar
 
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import Executable, Result, select
+from sqlalchemy.exc import (
+    IntegrityError,
+    InterfaceError,
+    OperationalError,
+    TimeoutError,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from raspbot.core import exceptions as exc
 from raspbot.core.logging import configure_logging
-from raspbot.db.base import BaseORM, async_session_factory
+from raspbot.core.metrics import metrics
+from raspbot.db.base import (
+    BaseORM,
+    get_current_read_session,
+    get_current_session,
+    read_engine,
+    set_replica_failed,
+    tag_statements,
+)
 
 logger = configure_logging(__name__)
 
@@ -17,34 +31,76 @@ DatabaseModel = TypeVar("DatabaseModel", bound=BaseORM)
 class CRUDBase(abc.ABC):
     """Abstract base class for CRUD operations."""
 
-    def __init__(
-        self,
-        model: Type[DatabaseModel],
-        session: AsyncSession = async_session_factory(),
-    ):
+    def __init__(self, model: Type[DatabaseModel]):
         """Initializes CRUDBase class instance."""
         self._model = model
-        self._session = session
 
+    def __init_subclass__(cls, **kwargs: Any):
+        """Tags the statements of the public methods with the method names.
+
+        The private helpers run under the tag of the calling public method.
+        """
+        super().__init_subclass__(**kwargs)
+        for name, attribute in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(attribute):
+                setattr(cls, name, tag_statements(attribute))
+
+    @property
+    def _session(self) -> AsyncSession:
+        """The session of the enclosing session_scope, e.g. of the bot update.
+
+        The changes are flushed, the scope commits them once on exit.
+        """
+        return get_current_session()
+
+    async def _execute_read(
+        self,
+        statement: Executable,
+        params: dict[str, Any] | None = None,
+        on_primary: bool = False,
+    ) -> Result:
+        """Executes the read-only statement, on the read replica if there is one.
+
+        Falls back to the primary if the replica cannot be reached.
+        The reads that must see the writes of the previous updates of the user,
+        e.g. of the recent upserted when the timetable was shown, pass on_primary:
+        the replica may lag behind and return nothing.
+        """
+        read_session = self._session if on_primary else get_current_read_session()
+        try:
+            return await read_session.execute(statement, params)
+        except (OSError, InterfaceError, OperationalError, TimeoutError) as e:
+            if read_engine is None or read_session.bind is not read_engine:
+                raise
+            logger.warning(f"Read replica failed, falling back to the primary: {e}")
+            metrics.counter("db.replica.fallbacks").inc()
+            set_replica_failed()
+            return await self._session.execute(statement, params)
+
+    @tag_statements
     async def get_or_raise(self, _id: int) -> DatabaseModel:
         """Gets the model object from the DB by its ID. Returns None if nonexistent."""
-        async with self._session as session:
-            query = await session.execute(
-                select(self._model).where(self._model.id == _id)
-            )
-            db_obj = query.scalars().first()
-            if not db_obj:
-                raise exc.NoDBObjectError(f"Object with id {_id} does not exist.")
-            return db_obj
+        query = await self._execute_read(
+            select(self._model)
+            .where(self._model.id == _id)
+            .execution_options(populate_existing=True),
+            on_primary=True,
+        )
+        db_obj = query.scalars().first()
+        if not db_obj:
+            raise exc.NoDBObjectError(f"Object with id {_id} does not exist.")
+        return db_obj
 
+    @tag_statements
     async def create(self, instance: DatabaseModel) -> DatabaseModel:
         """Creates the new model object and saves to DB."""
-        async with self._session as session:
-            session.add(instance)
-            try:
-                await session.commit()
-            except IntegrityError:
-                raise exc.AlreadyExistsError(f"Instance {instance} already exists.")
-
-            await session.refresh(instance)
-            return instance
+        session = self._session
+        try:
+            # The savepoint keeps the transaction usable if the instance exists
+            async with session.begin_nested():
+                session.add(instance)
+        except IntegrityError:
+            raise exc.AlreadyExistsError(f"Instance {instance} already exists.")
+
+        await session.refresh(instance)
+        return instance
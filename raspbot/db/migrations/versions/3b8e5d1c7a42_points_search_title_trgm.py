@@ -0,0 +1,48 @@
+"""Points search title with trigram index
+
+Revision ID: 3b8e5d1c7a42
+Revises: 19288bf9a4c0
+Create Date: 2026-10-19 09:12:40.118532
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3b8e5d1c7a42"
+down_revision = "19288bf9a4c0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    # unaccent() is only STABLE, so it cannot be used in a generated column
+    # or an index. Pinning the dictionary makes the wrapper safe to mark IMMUTABLE.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+        """)
+    op.add_column(
+        "points",
+        sa.Column(
+            "search_title",
+            sa.String(length=100),
+            sa.Computed("replace(lower(f_unaccent(title)), 'ё', 'е')", persisted=True),
+            nullable=True,
+        ),
+    )
+    op.execute(
+        "CREATE INDEX ix_points_search_title_trgm ON points "
+        "USING gin (search_title gin_trgm_ops);"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_points_search_title_trgm;")
+    op.drop_column("points", "search_title")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text);")
+    # pg_trgm is left in place: it may have been installed before this migration,
+    # and other objects may depend on it.
@@ -0,0 +1,42 @@
+"""Recents, points and routes indexes
+
+Revision ID: 5e2b7c9a1f30
+Revises: 8c41f0a9d2e6
+Create Date: 2026-10-19 14:21:08.312457
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5e2b7c9a1f30"
+down_revision = "8c41f0a9d2e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_recents_user_id_favorite_count_updated_at",
+        "recents",
+        ["user_id", "favorite", sa.text("count DESC"), sa.text("updated_at DESC")],
+        postgresql_include=["route_id"],
+    )
+    op.create_index(
+        "ix_recents_user_id_count_updated_at",
+        "recents",
+        ["user_id", sa.text("count DESC"), sa.text("updated_at DESC")],
+        postgresql_include=["route_id"],
+    )
+    op.create_index("ix_points_region_id", "points", ["region_id"])
+    op.create_index(
+        "ix_routes_destination_point_id", "routes", ["destination_point_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_routes_destination_point_id", table_name="routes")
+    op.drop_index("ix_points_region_id", table_name="points")
+    op.drop_index("ix_recents_user_id_count_updated_at", table_name="recents")
+    op.drop_index("ix_recents_user_id_favorite_count_updated_at", table_name="recents")
@@ -0,0 +1,55 @@
+"""Points is_current flag
+
+Revision ID: 8c41f0a9d2e6
+Revises: 3b8e5d1c7a42
+Create Date: 2026-10-19 10:03:27.640915
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8c41f0a9d2e6"
+down_revision = "3b8e5d1c7a42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "points",
+        sa.Column(
+            "is_current", sa.Boolean(), server_default=sa.true(), nullable=False
+        ),
+    )
+    # Only the latest version of every point stays current
+    op.execute(
+        """
+        UPDATE points
+        SET is_current = (points.created_at = latest.max_created_at)
+        FROM (
+            SELECT title, yandex_code, point_type, max(created_at) AS max_created_at
+            FROM points
+            GROUP BY title, yandex_code, point_type
+        ) AS latest
+        WHERE points.title = latest.title
+            AND points.yandex_code = latest.yandex_code
+            AND points.point_type = latest.point_type;
+        """
+    )
+    op.execute("UPDATE points SET is_current = false WHERE yandex_code IS NULL;")
+    op.execute("DROP INDEX IF EXISTS ix_points_search_title_trgm;")
+    op.execute(
+        "CREATE INDEX ix_points_search_title_trgm ON points "
+        "USING gin (search_title gin_trgm_ops) WHERE is_current;"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_points_search_title_trgm;")
+    op.execute(
+        "CREATE INDEX ix_points_search_title_trgm ON points "
+        "USING gin (search_title gin_trgm_ops);"
+    )
+    op.drop_column("points", "is_current")
@@ -1,14 +1,14 @@
 from typing import Sequence
 
-from sqlalchemy import and_, func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import ColumnElement, Select, and_, case, func, select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import joinedload
 
 from raspbot.core import exceptions as exc
 from raspbot.core.logging import configure_logging
-from raspbot.db.base import async_session_factory
 from raspbot.db.crud import CRUDBase
-from raspbot.db.models import PointORM, RouteORM
+from raspbot.db.models import PointORM, PointTypeEnum, RouteORM
+from raspbot.settings import settings
 
 logger = configure_logging(__name__)
 
@@ -16,116 +16,183 @@ logger = configure_logging(__name__)
 class CRUDPoints(CRUDBase):
     """CRUD for Point related operations."""
 
-    def __init__(self, session: AsyncSession = async_session_factory()):
+    def __init__(self):
         """Initializes CRUDPoints class instance."""
-        super().__init__(PointORM, session)
+        super().__init__(PointORM)
+
+    @staticmethod
+    def _normalize(title: str) -> ColumnElement[str]:
+        """Normalizes the user input the same way as PointORM.search_title."""
+        return func.replace(func.lower(func.f_unaccent(title)), "ё", "е")
+
+    @staticmethod
+    def _escape_like(title: str) -> str:
+        """Escapes the LIKE wildcards in the user input."""
+        return title.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    def _select_current_points(
+        self, condition: ColumnElement[bool]
+    ) -> Select[tuple[PointORM]]:
+        """Builds a query selecting the current version of the matching points."""
+        return (
+            select(PointORM)
+            .where(PointORM.is_current, condition)
+            .options(joinedload(PointORM.region))
+        )
 
     async def get_points_by_title(
-        self, title: str, strict_search: bool = False
+        self,
+        title: str,
+        strict_search: bool = False,
+        limit: int = settings.POINT_SEARCH_LIMIT,
     ) -> Sequence[PointORM]:
-        """Gets points by title."""
-        search_template = "{title}" if strict_search else "%{title}%"
+        """Gets points by title, best matches first.
 
-        async with self._session as session:
-            fields_defining_uniqueness = [
-                PointORM.title,
-                PointORM.yandex_code,
-                PointORM.point_type,
-            ]
-            # Define a subquery to find the maximum created_at
-            # for each combination of title, yandex_code and point_type
-            subquery = (
-                select(  # type: ignore
-                    *fields_defining_uniqueness,
-                    func.max(PointORM.created_at).label("max_created_at"),
-                )
-                .where(
-                    func.unaccent(PointORM.title).ilike(
-                        search_template.format(title=title)
-                    )
-                )
-                .group_by(*fields_defining_uniqueness)
-                .alias("subq")
+        The search goes through the trigram index on PointORM.search_title:
+        the strict search is an equality, otherwise the title is searched
+        anywhere in the point title, which includes the prefix matches.
+
+        The points are ranked by the match class (exact, starts with, contains),
+        then stations go before settlements, then by title. The limit is applied
+        after the ranking, so that the exact matches are never cut off.
+        """
+        normalized_title = self._normalize(title)
+        if strict_search:
+            condition = PointORM.search_title == normalized_title
+        else:
+            condition = PointORM.search_title.like(
+                func.concat("%", self._normalize(self._escape_like(title)), "%"),
+                escape="\\",
             )
+        match_rank = case(
+            (PointORM.search_title == normalized_title, 0),
+            (
+                PointORM.search_title.like(
+                    func.concat(self._normalize(self._escape_like(title)), "%"),
+                    escape="\\",
+                ),
+                1,
+            ),
+            else_=2,
+        )
+        point_type_rank = case(
+            (PointORM.point_type == PointTypeEnum.station, 0), else_=1
+        )
 
-            # Define the main query to select the PointORM instances
-            # with the latest created_at for each group
-            query = (
-                select(PointORM)
-                .join(
-                    subquery,
-                    and_(
-                        PointORM.title == subquery.c.title,
-                        PointORM.yandex_code == subquery.c.yandex_code,
-                        PointORM.point_type == subquery.c.point_type,
-                    ),
-                )
-                .where(PointORM.created_at == subquery.c.max_created_at)
-                .options(joinedload(PointORM.region))
-                .order_by(PointORM.title)
-                .limit(30)
+        query = (
+            self._select_current_points(condition)
+            .order_by(match_rank, point_type_rank, PointORM.title)
+            .limit(limit)
+        )
+        points = await self._execute_read(query)
+        return points.scalars().unique().all()
+
+    async def get_similar_points_by_title(
+        self, title: str, limit: int = settings.POINT_SEARCH_LIMIT
+    ) -> Sequence[PointORM]:
+        """Gets points with titles similar to the given one (pg_trgm similarity).
+
+        Used as a fallback for the misspelled inputs that did not match anything.
+        """
+        normalized_title = self._normalize(title)
+        query = (
+            self._select_current_points(PointORM.search_title.op("%")(normalized_title))
+            .order_by(
+                func.similarity(PointORM.search_title, normalized_title).desc(),
+                PointORM.title,
             )
-            points = await session.execute(query)
-            return points.scalars().unique().all()
+            .limit(limit)
+        )
+        points = await self._execute_read(query)
+        return points.scalars().unique().all()
+
+    async def get_all_points(self) -> Sequence[PointORM]:
+        """Gets the current version of all the points that have a yandex_code."""
+        query = self._select_current_points(PointORM.yandex_code.is_not(None))
+        points = await self._execute_read(query)
+        return points.scalars().unique().all()
 
     async def get_point_by_id(self, id: int) -> PointORM:
         """Gets point by ID."""
-        async with self._session as session:
-            query = await session.execute(
-                select(PointORM)
-                .options(joinedload(PointORM.region))
-                .where(PointORM.id == id)
+        query = await self._execute_read(
+            select(PointORM)
+            .options(joinedload(PointORM.region))
+            .where(PointORM.id == id)
+        )
+        point = query.scalars().first()
+        if not point:
+            raise exc.NoDBObjectError(
+                f"Point with ID {id} does not exist in the database."
             )
-            point = query.scalars().first()
-            if not point:
-                raise exc.NoDBObjectError(
-                    f"Point with ID {id} does not exist in the database."
-                )
-            return point
+        return point
 
 
 class CRUDRoutes(CRUDBase):
     """CRUD for Route related operations."""
 
-    def __init__(self, session: AsyncSession = async_session_factory()):
+    def __init__(self):
         """Initializes CRUDRoutes class instance."""
-        super().__init__(RouteORM, session)
+        super().__init__(RouteORM)
 
     async def get_route_by_points(
         self, departure_point_id: int, destination_point_id: int
     ) -> RouteORM:
         """Gets route by departure and destination point IDs."""
-        async with self._session as session:
-            query = await session.execute(
-                select(RouteORM).where(
-                    and_(
-                        RouteORM.departure_point_id == departure_point_id,
-                        RouteORM.destination_point_id == destination_point_id,
-                    )
+        query = await self._execute_read(
+            select(RouteORM).where(
+                and_(
+                    RouteORM.departure_point_id == departure_point_id,
+                    RouteORM.destination_point_id == destination_point_id,
                 )
             )
-            route = query.scalars().first()
-            if not route:
-                raise exc.NoDBObjectError(
-                    f"Route between points with IDs {departure_point_id} and "
-                    f"{destination_point_id} does not exist in the database."
-                )
-            return route
+        )
+        route = query.scalars().first()
+        if not route:
+            raise exc.NoDBObjectError(
+                f"Route between points with IDs {departure_point_id} and "
+                f"{destination_point_id} does not exist in the database."
+            )
+        return route
+
+    async def upsert_route(
+        self, departure_point_id: int, destination_point_id: int
+    ) -> RouteORM:
+        """Gets the route by the departure and destination point IDs or creates it.
+
+        A single INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement,
+        so the concurrent calls for the same route never fail on
+        the uq_departure_destination constraint.
+        """
+        session = self._session
+        query = await session.scalars(
+            insert(RouteORM)
+            .values(
+                departure_point_id=departure_point_id,
+                destination_point_id=destination_point_id,
+            )
+            .on_conflict_do_update(
+                constraint="uq_departure_destination",
+                set_={"updated_at": func.now()},
+            )
+            .returning(RouteORM),
+            execution_options={"populate_existing": True},
+        )
+        return query.one()
 
     async def get_route_by_id(self, id: int) -> RouteORM:
         """Gets route by ID."""
-        async with self._session as session:
-            query = await session.execute(
-                select(RouteORM)
-                .options(
-                    joinedload(RouteORM.departure_point),
-                    joinedload(RouteORM.destination_point),
-                )
-                .where(RouteORM.id == id)
+        query = await self._execute_read(
+            select(RouteORM)
+            .options(
+                joinedload(RouteORM.departure_point),
+                joinedload(RouteORM.destination_point),
             )
-            route = query.scalars().first()
-            if not route:
-                raise exc.NoDBObjectError(
-                    f"Route with ID {id} does not exist in the database."
-                )
-            return route
+            .where(RouteORM.id == id),
+            on_primary=True,
+        )
+        route = query.scalars().first()
+        if not route:
+            raise exc.NoDBObjectError(
+                f"Route with ID {id} does not exist in the database."
+            )
+        return route
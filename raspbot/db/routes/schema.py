@@ -25,16 +25,31 @@ class RouteProtocol(Protocol):
     destination_point: PointORM | PointResponsePD
 
 
+def get_route_description(
+    departure_type: PointTypeEnum,
+    departure_title: str,
+    destination_type: PointTypeEnum,
+    destination_title: str,
+) -> str:
+    """Route string representation from the types and titles of its points."""
+    return (
+        f"{get_short_point_type(departure_type)} "
+        f"{departure_title}{settings.ROUTE_INLINE_DELIMITER}"
+        f"{get_short_point_type(destination_type)} "
+        f"{destination_title}"
+    )
+
+
 class RouteStrMixin:
     """Mixin for Route string representation."""
 
     def __str__(self: "RouteProtocol") -> str:
         """String representation."""
-        return (
-            f"{get_short_point_type(self.departure_point.point_type)} "
-            f"{self.departure_point.title}{settings.ROUTE_INLINE_DELIMITER}"
-            f"{get_short_point_type(self.destination_point.point_type)} "
-            f"{self.destination_point.title}"
+        return get_route_description(
+            departure_type=self.departure_point.point_type,
+            departure_title=self.departure_point.title,
+            destination_type=self.destination_point.point_type,
+            destination_title=self.destination_point.title,
         )
 
     @property
@@ -15,16 +15,15 @@ the Yandex JSON: it gets the information about the countries, regions, settlemen
 stations etc from the JSON and packages them into pydantic objects that are easy
 to manipulate with.
 
-After the initial data has been structured, the process of converting it into
-SQLAlchemy models begins. This process is complicated by the fact that the
-relations between the different entities need to be maintained: e.g. a station
-shall have a foreign key to a settlement, which shall have a foreign key to a region,
-etc etc. This is handled by introducing connecting pydantic models (RegionsByCountry,
-PointsByRegion, etc) that have a parent entity in the form of an ORM model and the list
-of child entities as pydantic models.
-
-The ORM models with all the necessary relations are then added to sessions,
-and the sessions are committed. All of this is handled by fill_db module.
+After the initial data has been structured, it is compared to the DB. The regions
+and points are matched by their yandex_code, and only the differences are written:
+the new ones are inserted, the renamed or moved ones are updated in place, and the
+points missing from the data are marked as not current (soft-deleted). The rows are
+never deleted, so the routes referring to them stay valid. The existing rows are
+loaded into memory once, outside of any write transaction. The changes are then
+checked (an update that would soft-delete too many points is refused) and written
+with multi-row statements in a single short transaction, so the bot never reads
+half-updated data, and a failed update is rolled back as a whole.
 
 ---------- !!! NOTE ON DATABASE SCHEMA !!! ----------
 
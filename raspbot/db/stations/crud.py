@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from raspbot.core.logging import configure_logging
+from raspbot.db.crud import CRUDBase
+from raspbot.db.stations.models import LastUpdatedORM
+
+logger = configure_logging(__name__)
+
+
+class CRUDLastUpdated(CRUDBase):
+    """CRUD for the stations DB update records."""
+
+    def __init__(self):
+        """Initializes CRUDLastUpdated class instance."""
+        super().__init__(LastUpdatedORM)
+
+    async def get_latest_id(self) -> int | None:
+        """Gets the ID of the latest stations DB update, None if there is none."""
+        query = await self._execute_read(select(func.max(LastUpdatedORM.id)))
+        return query.scalar()
+
+    async def get_last_updated_at(self) -> datetime | None:
+        """Gets the time of the latest stations DB update, None if there is none."""
+        query = await self._execute_read(select(func.max(LastUpdatedORM.created_at)))
+        return query.scalar()
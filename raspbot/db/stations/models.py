@@ -1,7 +1,17 @@
 import asyncio
 from enum import Enum
 
-from sqlalchemy import Float, ForeignKey, String
+from sqlalchemy import (
+    DDL,
+    Boolean,
+    Computed,
+    Float,
+    ForeignKey,
+    Index,
+    String,
+    event,
+    true,
+)
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -19,6 +29,27 @@ from raspbot.settings import settings
 # Float = cast(type[TypeEngine[float]], Float_org)
 
 
+SEARCH_TITLE_EXPRESSION = "replace(lower(f_unaccent(title)), 'ё', 'е')"
+
+# The extensions and the function the search_title column and its index rely on.
+# Alembic migrations create them, these DDLs do the same for create_db_schema.
+SEARCH_TITLE_DDLS = (
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # unaccent() is only STABLE, so it cannot be used in a generated column
+    # or an index. Pinning the dictionary makes the wrapper safe to mark IMMUTABLE.
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """,
+)
+for ddl in SEARCH_TITLE_DDLS:
+    event.listen(
+        BaseORM.metadata, "before_create", DDL(ddl).execute_if(dialect="postgresql")
+    )
+
+
 class PointTypeEnum(Enum):
     """Point type choices."""
 
@@ -44,8 +75,30 @@ class PointORM(BaseORM, StationCommonMixin):
     station_type: Mapped[str | None] = mapped_column(String(100), default=None)
     latitude: Mapped[Float | None] = mapped_column(Float, default=None)
     longitude: Mapped[Float | None] = mapped_column(Float, default=None)
-    region_id: Mapped[int] = mapped_column(ForeignKey("regions.id"))
+    region_id: Mapped[int] = mapped_column(ForeignKey("regions.id"), index=True)
     region: Mapped["RegionORM"] = relationship("RegionORM", back_populates="points")
+    # Lower-cased title without diacritics and with ё replaced by е.
+    # Maintained by Postgres, the f_unaccent function is created by the migrations.
+    search_title: Mapped[str | None] = mapped_column(
+        String(100),
+        Computed(SEARCH_TITLE_EXPRESSION, persisted=True),
+    )
+
+    # The points missing from the latest dataset are not current. They are kept,
+    # as the old routes refer to them, but the searches skip them.
+    is_current: Mapped[bool] = mapped_column(
+        Boolean, default=True, server_default=true()
+    )
+
+    __table_args__ = (
+        Index(
+            "ix_points_search_title_trgm",
+            "search_title",
+            postgresql_using="gin",
+            postgresql_ops={"search_title": "gin_trgm_ops"},
+            postgresql_where=is_current,
+        ),
+    )
 
 
 class RegionORM(BaseORM, StationCommonMixin):
@@ -72,6 +125,8 @@ async def create_db_schema():
 
     Normally this is handled by alembic migrations (alembic upgrade head).
     Launch this manually only if there are problems with alembic.
+    The unaccent and pg_trgm extensions and the f_unaccent function are created
+    first, the DB user needs the right to create extensions.
     """
     try:
         async with engine.begin() as conn:
@@ -9,15 +9,17 @@ a unit of the Yandex station data structure.
 
 import asyncio
 import json
+from dataclasses import dataclass, field
 from datetime import datetime
 from itertools import chain
 from pathlib import Path
-from typing import Any, AsyncGenerator, Type
+from typing import Any, AsyncGenerator, Callable, Iterator
 
 from pydantic import ValidationError
-from sqlalchemy import select
+from sqlalchemy import Integer, any_, bindparam, insert, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.ext.declarative import DeclarativeMeta
 
 from raspbot.apicalls.base import get_response
 from raspbot.apicalls.search import TransportTypes
@@ -25,7 +27,7 @@ from raspbot.core import exceptions as exc
 from raspbot.core.email import send_email_async
 from raspbot.core.logging import configure_logging, log
 from raspbot.db.base import async_session_factory
-from raspbot.db.stations import models, schema
+from raspbot.db.stations import models
 from raspbot.db.stations.schema import RegionPD
 from raspbot.services.prettify_datetimes import prettify_time
 from raspbot.settings import settings
@@ -33,28 +35,30 @@ from raspbot.settings import settings
 logger = configure_logging(__name__)
 
 
-@log(logger)
-def _log_object_creation(obj: object) -> None:
-    """Logs object creation and raises exceptions."""
-    if obj:
-        logger.debug(f"SUCCESS: {obj} has been created.")
+# Regions are identified by yandex_code, or by title if they have none
+RegionKey = str
+PointKey = tuple[str, models.PointTypeEnum]
 
-    else:
-        raise exc.SQLObjectError(f"FAILURE: object {obj} has NOT been created.")
+# The point fields taken from the dataset, compared to detect the changes,
+# along with the region
+POINT_FIELDS = ("title", "station_type", "latitude", "longitude")
 
 
-@log(logger)
-async def _instance_exists_in_database(
-    session: AsyncSession, model: Type[DeclarativeMeta], **kwargs
-) -> DeclarativeMeta | None:
-    # Construct the filter criteria dynamically using kwargs
-    filters = [getattr(model, key) == value for key, value in kwargs.items()]
+@dataclass
+class DiffCounts:
+    """Numbers of the rows by the kind of change applied to them."""
 
-    # Query the database for an instance with the specified attribute values
-    query = await session.execute(select(model).where(*filters))
-    existing_instance = query.scalars().first()
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    soft_deleted: int = 0
 
-    return existing_instance
+    def __str__(self) -> str:
+        """String representation."""
+        return (
+            f"{self.inserted} inserted, {self.updated} updated, "
+            f"{self.unchanged} unchanged, {self.soft_deleted} soft-deleted"
+        )
 
 
 @log(logger)
@@ -99,147 +103,251 @@ async def _yield_regions_pd(
                     yield region_pd
 
 
-@log(logger)
-async def _yield_regions_orm_and_add_to_db(
-    region_generator: AsyncGenerator[schema.RegionPD, None], session: AsyncSession
-) -> AsyncGenerator[tuple[int, schema.RegionPD], None]:
-    """A generator that receives the regions and gets their DB IDs.
+def _get_region_key(title: str, yandex_code: str | None) -> RegionKey:
+    """Returns the key identifying the region across the datasets."""
+    return yandex_code or title
+
 
-    It yields tuples containing a region ORM object ID and a corresponding pydantic
-    schema model instance. Adds regions to the session as it goes.
+@dataclass
+class StationsDiff:
+    """Changes bringing the regions and points in the DB in line with the dataset.
+
+    The points refer to their regions by region_key, as the IDs of the new
+    regions are only known once they have been inserted.
     """
-    async for region in region_generator:
-        attrs = {
-            "title": region.title,
-            "yandex_code": region.codes.yandex_code,
-        }
-        existing_region = await _instance_exists_in_database(
-            session, models.RegionORM, **attrs
-        )
-        if existing_region:
-            continue
-        sql_obj = models.RegionORM(**attrs)
-        try:
-            _log_object_creation(sql_obj)
-        except exc.SQLObjectError as e:
-            logger.error(e)
-            continue
-        session.add(sql_obj)
-        await session.flush()
-        yield tuple((sql_obj.id, region))  # type: ignore
 
+    region_ids: dict[RegionKey, int] = field(default_factory=dict)
+    new_regions: dict[RegionKey, dict[str, Any]] = field(default_factory=dict)
+    renamed_regions: list[dict[str, Any]] = field(default_factory=list)
+    new_points: list[dict[str, Any]] = field(default_factory=list)
+    changed_points: list[dict[str, Any]] = field(default_factory=list)
+    deleted_point_ids: list[int] = field(default_factory=list)
+    region_counts: DiffCounts = field(default_factory=DiffCounts)
+    point_counts: DiffCounts = field(default_factory=DiffCounts)
+    current_points: int = 0
 
-@log(logger)
-async def _yield_points_by_region_pd(
-    regions_orm_generator: AsyncGenerator[tuple[int, schema.RegionPD], None],
-    session: AsyncSession,
-) -> AsyncGenerator[schema.PointsByRegionPD, None]:
-    """Receives regions and returns settlements by regions."""
-    async for region in regions_orm_generator:
-        region_sql_obj = await session.get(models.RegionORM, region[0])
-
-        if not region_sql_obj:
-            raise exc.NoDBObjectError(
-                f"Region with ID {region[0]} was not found in the DB."
+
+async def _get_regions_diff(
+    regions: list[RegionPD], diff: StationsDiff, session: AsyncSession
+) -> None:
+    """Finds the new and the renamed regions.
+
+    Regions are never deleted, as the points of the old routes refer to them.
+    """
+    query = await session.execute(
+        select(
+            models.RegionORM.id, models.RegionORM.title, models.RegionORM.yandex_code
+        ).order_by(models.RegionORM.created_at)
+    )
+    # The latest of the duplicates left by the earlier populations wins
+    existing = {
+        _get_region_key(title, yandex_code): (_id, title)
+        for _id, title, yandex_code in query
+    }
+    region_ids = diff.region_ids
+    for region in regions:
+        key = _get_region_key(region.title, region.codes.yandex_code)
+        if key in region_ids or key in diff.new_regions:
+            continue
+        if key not in existing:
+            diff.new_regions[key] = {
+                "title": region.title,
+                "yandex_code": region.codes.yandex_code,
+            }
+            continue
+        _id, title = existing[key]
+        region_ids[key] = _id
+        if title != region.title:
+            diff.renamed_regions.append({"id": _id, "title": region.title})
+        else:
+            diff.region_counts.unchanged += 1
+    diff.region_counts.inserted = len(diff.new_regions)
+    diff.region_counts.updated = len(diff.renamed_regions)
+
+
+def _yield_incoming_points(
+    region: RegionPD,
+) -> Iterator[tuple[PointKey, dict[str, Any]]]:
+    """Yields the keys and the rows of the settlements and stations of the region."""
+    region_key = _get_region_key(region.title, region.codes.yandex_code)
+    for settlement in region.settlements:
+        if not settlement.codes.yandex_code:
+            logger.warning(
+                f"FAILURE: settlement {settlement.title} has NOT been created: "
+                "no yandex_code"
             )
+            continue
+        yield (settlement.codes.yandex_code, models.PointTypeEnum.settlement), {
+            "point_type": models.PointTypeEnum.settlement,
+            "title": settlement.title,
+            "yandex_code": settlement.codes.yandex_code,
+            # All the rows have the same keys, so that they go in the same batches
+            "station_type": None,
+            "latitude": None,
+            "longitude": None,
+            "region_key": region_key,
+        }
 
-        region_pd_obj = region[1]
-        stations = list(
-            chain.from_iterable(
-                [settlement.stations for settlement in region_pd_obj.settlements]
+    for station in chain.from_iterable(
+        settlement.stations for settlement in region.settlements
+    ):
+        if not station.codes.yandex_code:
+            logger.warning(
+                f"FAILURE: station {station.title} has NOT been created: "
+                "no yandex_code"
             )
-        )
-        points = schema.PointsByRegionPD(
-            region_orm=region_sql_obj,
-            settlements=region_pd_obj.settlements,
-            stations=stations,
-        )
-        try:
-            _log_object_creation(points)
-        except exc.SQLObjectError as e:
-            logger.error(e)
             continue
-        yield points
+        if station.transport_type not in (
+            TransportTypes.TRAIN.value,
+            TransportTypes.SUBURBAN.value,
+            "",
+            None,
+        ):
+            logger.info(
+                f"Skipping non-train transport type: {station.transport_type} "
+                f"for station {station.title}"
+            )
+            continue
+        yield (station.codes.yandex_code, models.PointTypeEnum.station), {
+            "point_type": models.PointTypeEnum.station,
+            "title": station.title,
+            "yandex_code": station.codes.yandex_code,
+            "station_type": station.station_type,
+            "latitude": (
+                station.latitude if isinstance(station.latitude, float) else None
+            ),
+            "longitude": (
+                station.longitude if isinstance(station.longitude, float) else None
+            ),
+            "region_key": region_key,
+        }
 
 
-@log(logger)
-async def _add_points_to_db(  # noqa: C901
-    points_by_region_generator: AsyncGenerator[schema.PointsByRegionPD, None],
+async def _get_points_diff(
+    incoming: dict[PointKey, dict[str, Any]],
+    diff: StationsDiff,
     session: AsyncSession,
 ) -> None:
-    """Receives stations and adds them to the database."""
-    async for item in points_by_region_generator:
-        for settlement in item.settlements:
-            if not settlement.codes.yandex_code:
-                logger.warning(
-                    f"FAILURE: settlement {settlement.title} has NOT been created: "
-                    "no yandex_code"
-                )
-                continue
-            attrs = {
-                "point_type": models.PointTypeEnum.settlement,
-                "title": settlement.title,
-                "yandex_code": settlement.codes.yandex_code,
-            }
-            existing_settlement = await _instance_exists_in_database(
-                session, models.PointORM, **attrs
-            )
-            if existing_settlement:
-                continue
-            sql_obj = models.PointORM(region=item.region_orm, **attrs)
-            try:
-                _log_object_creation(sql_obj)
-            except exc.SQLObjectError as e:
-                logger.error(e)
-                continue
-            session.add(sql_obj)
-
-        for station in item.stations:
-            if not station.codes.yandex_code:
-                logger.warning(
-                    f"FAILURE: station {station.title} has NOT been created: "
-                    "no yandex_code"
-                )
-                continue
-            if station.transport_type not in (
-                TransportTypes.TRAIN.value,
-                TransportTypes.SUBURBAN.value,
-                "",
-                None,
-            ):
-                logger.info(
-                    f"Skipping non-train transport type: {station.transport_type} "
-                    f"for station {station.title}"
-                )
-                continue
-            attrs = {
-                "point_type": models.PointTypeEnum.station,
-                "title": station.title,
-                "yandex_code": station.codes.yandex_code,
-            }
-            existing_station = await _instance_exists_in_database(
-                session, models.PointORM, **attrs
-            )
-            if existing_station:
-                continue
-            latitude = station.latitude if isinstance(station.latitude, float) else None
-            longitude = (
-                station.longitude if isinstance(station.longitude, float) else None
-            )
-            sql_obj = models.PointORM(
-                station_type=station.station_type,
-                latitude=latitude,
-                longitude=longitude,
-                region=item.region_orm,
-                **attrs,
+    """Finds the new, the changed and the deleted points.
+
+    The points are matched by yandex_code and point type. The current points
+    missing from the dataset are to be marked as not current: the rows are never
+    deleted and keep their IDs, so the routes referring to them stay valid.
+    """
+    query = await session.execute(
+        select(
+            models.PointORM.id,
+            models.PointORM.yandex_code,
+            models.PointORM.point_type,
+            models.PointORM.is_current,
+            models.PointORM.region_id,
+            *(getattr(models.PointORM, name) for name in POINT_FIELDS),
+        ).order_by(models.PointORM.is_current, models.PointORM.created_at)
+    )
+    # The current and the latest of the duplicates left by the earlier
+    # populations is the one to keep up to date
+    existing = {}
+    current_ids = set()
+    for row in query:
+        if row.is_current:
+            current_ids.add(row.id)
+        if row.yandex_code is not None:
+            existing[(row.yandex_code, row.point_type)] = row
+
+    kept_ids = set()
+    for key, point in incoming.items():
+        row = existing.get(key)
+        if row is None:
+            diff.new_points.append(point)
+            continue
+        kept_ids.add(row.id)
+        # None for a new region, which is a change of the region too
+        region_id = diff.region_ids.get(point["region_key"])
+        if (
+            row.is_current
+            and row.region_id == region_id
+            and all(getattr(row, name) == point[name] for name in POINT_FIELDS)
+        ):
+            diff.point_counts.unchanged += 1
+            continue
+        diff.changed_points.append({"id": row.id, **point, "is_current": True})
+    diff.deleted_point_ids = list(current_ids - kept_ids)
+    diff.current_points = len(current_ids)
+    diff.point_counts.inserted = len(diff.new_points)
+    diff.point_counts.updated = len(diff.changed_points)
+    diff.point_counts.soft_deleted = len(diff.deleted_point_ids)
+
+
+async def _get_stations_diff(
+    regions: list[RegionPD], session: AsyncSession
+) -> StationsDiff:
+    """Compares the dataset to the DB in memory. Only reads from the DB."""
+    diff = StationsDiff()
+    await _get_regions_diff(regions, diff, session)
+    incoming: dict[PointKey, dict[str, Any]] = {}
+    for region in regions:
+        for key, point in _yield_incoming_points(region):
+            # The first of the duplicates in the dataset wins
+            incoming.setdefault(key, point)
+    await _get_points_diff(incoming, diff, session)
+    return diff
+
+
+def _validate_stations_diff(
+    diff: StationsDiff,
+    max_soft_deleted_share: float = settings.STATIONS_MAX_SOFT_DELETED_SHARE,
+) -> None:
+    """Refuses the diff that would soft-delete too many of the current points.
+
+    Such a diff means a truncated or broken dataset rather than real changes.
+    """
+    soft_deleted = diff.point_counts.soft_deleted
+    if soft_deleted > diff.current_points * max_soft_deleted_share:
+        raise exc.DataValidationError(
+            f"The new stations data would soft-delete {soft_deleted} of "
+            f"{diff.current_points} current points, over the allowed share of "
+            f"{max_soft_deleted_share:.0%}. The DB has been left unchanged."
+        )
+
+
+async def _apply_stations_diff(diff: StationsDiff, session: AsyncSession) -> None:
+    """Writes the changes with multi-row statements."""
+    region_ids = dict(diff.region_ids)
+    if diff.new_regions:
+        query = await session.execute(
+            insert(models.RegionORM).returning(
+                models.RegionORM.id, sort_by_parameter_order=True
+            ),
+            list(diff.new_regions.values()),
+        )
+        region_ids.update(zip(diff.new_regions, query.scalars()))
+    if diff.renamed_regions:
+        await session.execute(update(models.RegionORM), diff.renamed_regions)
+
+    def with_region_id(point: dict[str, Any]) -> dict[str, Any]:
+        point = dict(point)
+        point["region_id"] = region_ids[point.pop("region_key")]
+        return point
+
+    if diff.new_points:
+        # Sent as multi-row INSERTs of up to insertmanyvalues_page_size rows
+        await session.execute(
+            insert(models.PointORM), [with_region_id(p) for p in diff.new_points]
+        )
+    if diff.changed_points:
+        await session.execute(
+            update(models.PointORM), [with_region_id(p) for p in diff.changed_points]
+        )
+    if diff.deleted_point_ids:
+        await session.execute(
+            update(models.PointORM)
+            .where(
+                models.PointORM.id
+                == any_(bindparam("ids", diff.deleted_point_ids, type_=ARRAY(Integer)))
             )
-            try:
-                _log_object_creation(sql_obj)
-            except exc.SQLObjectError as e:
-                logger.error(e)
-                continue
-            session.add(sql_obj)
-    await session.flush()
+            .values(is_current=False)
+            .execution_options(synchronize_session=False)
+        )
 
 
 @log(logger)
@@ -250,65 +358,79 @@ async def _add_last_updated_time(session: AsyncSession) -> None:
 
 
 @log(logger)
-async def populate_db(initial_data: dict | Path) -> None:
-    """Populates the stations DB with the initial data."""
+async def populate_db(
+    initial_data: dict | Path, report_progress: Callable[[str], Any] = logger.info
+) -> str | None:
+    """Brings the stations DB in line with the initial data.
+
+    The diff is computed from a read-only session, so the long part of the work
+    holds no locks. Then it is validated and applied in a single short
+    transaction: the readers see either the old or the new data, and if
+    anything fails, the transaction is rolled back and the DB is left unchanged.
+    Returns the summary of the population, or None if it has failed.
+    """
     logger.debug("Ready for the DB population.")
     start_time = datetime.now()
 
     try:
-        regions_generator = _yield_regions_pd(initial_data)
-    except exc.DataStructureError as e:
-        logger.exception(f"Data structure error: {e}", exc_info=True)
+        report_progress("Structuring the initial data.")
+        regions = [region async for region in _yield_regions_pd(initial_data)]
+        report_progress(f"Comparing {len(regions)} regions to the DB.")
+        async with async_session_factory() as session:
+            diff = await _get_stations_diff(regions, session)
+        _validate_stations_diff(diff)
+    except (exc.GetDataError, SQLAlchemyError) as e:
+        logger.exception(f"Stations DB population failed: {e}", exc_info=True)
+        await send_email_async(e)
+        return None
+    changes = f"Regions: {diff.region_counts}. Points: {diff.point_counts}."
+    report_progress(f"Applying the changes. {changes}")
 
+    apply_start_time = datetime.now()
     async with async_session_factory() as session:
         try:
-            regions_orm_generator = _yield_regions_orm_and_add_to_db(
-                regions_generator, session
-            )
-            points_by_region_generator = _yield_points_by_region_pd(
-                regions_orm_generator, session
-            )
-            await _add_points_to_db(points_by_region_generator, session)
-        except exc.SQLError as e:
-            logger.exception(f"Adding stations to DB failed: {e}", exc_info=True)
-        else:
-            logger.debug("Stations added to DB.")
-
-        try:
+            await _apply_stations_diff(diff, session)
             await _add_last_updated_time(session)
-        except exc.SQLError as e:
-            logger.exception(
-                f"Adding the updated date to DB failed: {e}", exc_info=True
-            )
-
-        try:
             await session.commit()
         except Exception as e:
-            logger.exception(f"DB population failed: {e}", exc_info=True)
+            await session.rollback()
+            logger.exception(
+                f"Applying the stations DB changes failed, rolled back: {e}",
+                exc_info=True,
+            )
             await send_email_async(e)
+            return None
+
+    finish_time = datetime.now()
+    it_took = (
+        "Station DB has been populated. It took "
+        f"{prettify_time((finish_time - start_time).total_seconds())} seconds "
+        "to fill the Stations DB with the data from API, of which the changes "
+        f"took {prettify_time((finish_time - apply_start_time).total_seconds())} "
+        f"seconds to apply. {changes}"
+    )
+    logger.info(it_took)
+    await send_email_async(it_took)
+    return it_took
 
-        finish_time = datetime.now()
-        it_took = (
-            "Station DB has been populated. It took "
-            f"{prettify_time((finish_time - start_time).total_seconds())} seconds "
-            "to fill the Stations DB with the data from API."
-        )
-        logger.info(it_took)
-        await send_email_async(it_took)
 
+async def main(report_progress: Callable[[str], Any] = logger.info) -> str | None:
+    """Obtains the initial data and populates the stations DB with it.
 
-async def main() -> None:
-    """Obtains the initial data and populates the stations DB with it."""
+    Returns the summary of the population, or None if it has failed.
+    """
     try:
+        report_progress("Downloading the stations data.")
         initial_data: dict = await get_response(
             endpoint=settings.STATIONS_LIST_ENDPOINT, headers=settings.headers
         )
     except exc.APIError as e:
         logger.exception(e)
         await send_email_async(e)
+        return None
 
     logger.info("Starting to populate the Stations DB.")
-    await populate_db(initial_data)
+    return await populate_db(initial_data, report_progress=report_progress)
 
 
 if __name__ == "__main__":
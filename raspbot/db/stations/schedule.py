@@ -5,46 +5,50 @@ from apscheduler.schedulers.asyncio import (  # type: ignore
     AsyncIOScheduler,
     BaseScheduler,
 )
-from sqlalchemy import func, select
 
 from raspbot.core.logging import configure_logging
-from raspbot.db.base import async_session_factory
-from raspbot.db.stations.models import LastUpdatedORM
-from raspbot.db.stations.parse import main
+from raspbot.db.base import session_scope
+from raspbot.db.stations.crud import CRUDLastUpdated
+from raspbot.db.stations.worker import populate_db_in_worker
+from raspbot.services.point_cache import refresh_point_caches
 from raspbot.settings import settings
 
 logger = configure_logging(__name__)
 
+crud_last_updated = CRUDLastUpdated()
+
 
 async def check_last_station_db_update(
     days_between_updates: int = settings.DAYS_BETWEEN_STATIONS_DB_UPDATE,
 ) -> None:
-    """Checks when the stations DB was last updated."""
+    """Checks when the stations DB was last updated, repopulates it if needed."""
     logger.info("Starting to check when the stations DB was last updated.")
-    async with async_session_factory() as session:
-        query = await session.execute(select(func.max(LastUpdatedORM.created_at)))
-        last_updated = query.scalar()
-        if not last_updated:
-            logger.info(
-                "There is no information in the DB about the stations DB update date."
-                "Therefore, starting DB population process now."
-            )
-            await main()
-        else:
-            max_time_diff = timedelta(days=days_between_updates)
-            current_time_diff = datetime.now(tz=timezone.utc) - last_updated
-            if current_time_diff > max_time_diff:
-                logger.info(
-                    f"It was more than {days_between_updates} days since the "
-                    "stations DB was last updated. Therefore, starting DB population "
-                    "process now."
-                )
-                await main()
-            logger.info(
-                "The stations DB was last updated at "
-                f"{last_updated.strftime(settings.LOG_DT_FMT)}. Less than "
-                f"{days_between_updates} days since the last update. No action needed."
-            )
+    # The scope is closed before the population, so that no connection
+    # is kept idle in transaction for the whole worker run
+    async with session_scope():
+        last_updated = await crud_last_updated.get_last_updated_at()
+    if not last_updated:
+        logger.info(
+            "There is no information in the DB about the stations DB update date."
+            "Therefore, starting DB population process now."
+        )
+    elif datetime.now(tz=timezone.utc) - last_updated > timedelta(
+        days=days_between_updates
+    ):
+        logger.info(
+            f"It was more than {days_between_updates} days since the "
+            "stations DB was last updated. Therefore, starting DB population "
+            "process now."
+        )
+    else:
+        logger.info(
+            "The stations DB was last updated at "
+            f"{last_updated.strftime(settings.LOG_DT_FMT)}. Less than "
+            f"{days_between_updates} days since the last update. No action needed."
+        )
+        return
+    await populate_db_in_worker()
+    await refresh_point_caches()
 
 
 def get_scheduler() -> BaseScheduler:
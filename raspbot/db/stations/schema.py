@@ -1,7 +1,5 @@
 from pydantic import BaseModel
 
-from raspbot.db.stations import models
-
 
 class BaseModelPD(BaseModel):
     """Base pydantic model."""
@@ -53,20 +51,3 @@ class RegionPD(EntityPD):
     """Region pydantic model."""
 
     settlements: list[SettlementPD]
-
-
-class PointsByRegionPD(BaseModelPD):
-    """Pydantic model for relationships between regions and points."""
-
-    region_orm: models.RegionORM
-    settlements: list[SettlementPD]
-    stations: list[StationPD]
-
-    class Config:
-        """Config for the EntitiesByEntityPD pydantic model."""
-
-        arbitrary_types_allowed = True
-
-    def __repr__(self) -> str:
-        """String representation of the PointsByRegion relationship."""
-        return f"{self.__class__.__name__} {self.region_orm.title}"
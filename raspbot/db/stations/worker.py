@@ -0,0 +1,70 @@
+"""Runs the stations DB population in a separate worker process.
+
+The population validates the stations data of the whole world and compares
+it to the DB in memory, which is CPU-bound work. Run on the event loop of the bot,
+it would stop the bot from answering the users until it is over.
+
+The same population can be started from the command line, e.g. by a system
+scheduler, with python -m raspbot.db.stations.parse. The running bot picks
+it up with watch_station_data_generation.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty, Queue
+
+from raspbot.core.logging import configure_logging
+from raspbot.db.stations.parse import main
+
+logger = configure_logging(__name__)
+
+# How often the bot process checks the progress of the worker, in seconds
+PROGRESS_POLL_INTERVAL = 1
+
+
+def _populate_db(progress: Queue) -> str | None:
+    """Entry point of the worker process. Runs the population on its own loop."""
+    return asyncio.run(main(report_progress=progress.put))
+
+
+def _log_progress(progress: Queue) -> None:
+    """Logs the progress messages received from the worker so far."""
+    while True:
+        try:
+            message = progress.get_nowait()
+        except Empty:
+            return
+        logger.info(f"Stations DB population: {message}")
+
+
+async def populate_db_in_worker() -> str | None:
+    """Populates the stations DB in a worker process and waits for it.
+
+    The event loop of the bot stays free while the worker runs: the blocking
+    start and shutdown of the worker and the Manager processes are run in
+    a thread. Returns the summary of the population, or None if it has failed.
+    """
+    # A fresh interpreter, rather than a fork of the process with the running
+    # event loop and the open DB connections
+    context = multiprocessing.get_context("spawn")
+    manager = await asyncio.to_thread(context.Manager)
+    executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+    try:
+        progress = manager.Queue()
+        # Submitting spawns the worker process
+        result = asyncio.wrap_future(
+            await asyncio.to_thread(executor.submit, _populate_db, progress)
+        )
+        while not result.done():
+            await asyncio.sleep(PROGRESS_POLL_INTERVAL)
+            _log_progress(progress)
+        _log_progress(progress)
+        try:
+            return await result
+        except Exception as e:
+            logger.exception(f"Stations DB population worker failed: {e}")
+            return None
+    finally:
+        await asyncio.to_thread(executor.shutdown)
+        await asyncio.to_thread(manager.shutdown)
@@ -1,34 +1,118 @@
-from typing import Sequence
-
-from sqlalchemy import and_, desc, select, update
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    Select,
+    and_,
+    any_,
+    bindparam,
+    desc,
+    func,
+    literal_column,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm import aliased, joinedload
 
 from raspbot.core import exceptions as exc
 from raspbot.core.email import send_email_async
 from raspbot.core.logging import configure_logging
-from raspbot.db.base import async_session_factory
 from raspbot.db.crud import CRUDBase
-from raspbot.db.models import RecentORM, RouteORM, UserORM
+from raspbot.db.models import PointORM, RecentORM, RouteORM, UserORM
+from raspbot.db.users.schema import RecentListItem
 from raspbot.settings import settings
 
 logger = configure_logging(name=__name__)
 
 
+def _get_recents_listing(*where: ColumnElement[bool]) -> Select:
+    """Builds the Core select of the recents listing rows of a user.
+
+    Selects the plain columns of RecentListItem, so neither ORM objects nor
+    identity map entries are created. The statements are built once with
+    a user_id bind parameter, so their compiled form is reused from
+    the compiled cache.
+    """
+    recents = RecentORM.__table__
+    routes = RouteORM.__table__
+    departures = PointORM.__table__.alias("departure_point")
+    destinations = PointORM.__table__.alias("destination_point")
+    return (
+        select(
+            recents.c.id,
+            recents.c.route_id,
+            recents.c.favorite,
+            departures.c.point_type,
+            departures.c.title,
+            destinations.c.point_type,
+            destinations.c.title,
+        )
+        .join_from(recents, routes, recents.c.route_id == routes.c.id)
+        .join(departures, routes.c.departure_point_id == departures.c.id)
+        .join(destinations, routes.c.destination_point_id == destinations.c.id)
+        .where(recents.c.user_id == bindparam("user_id"), *where)
+        .order_by(desc(recents.c.count), desc(recents.c.updated_at))
+        .limit(settings.RECENT_FAV_LIST_LENGTH)
+    )
+
+
+RECENTS_LISTING = _get_recents_listing()
+FAVORITES_LISTING = _get_recents_listing(RecentORM.__table__.c.favorite == True)  # noqa
+NOT_FAVORITES_LISTING = _get_recents_listing(
+    RecentORM.__table__.c.favorite == False  # noqa
+)
+
+
 class CRUDUsers(CRUDBase):
     """CRUD for user related operations."""
 
-    def __init__(self, session: AsyncSession = async_session_factory()):
+    def __init__(self):
         """Initializes CRUDUsers class instance."""
-        super().__init__(UserORM, session)
+        super().__init__(UserORM)
 
     async def get_user_by_telegram_id(self, telegram_id: int) -> UserORM | None:
         """Gets user by Telegram ID."""
-        async with self._session as session:
-            user = await session.execute(
-                select(UserORM).where(UserORM.telegram_id == telegram_id)
-            )
-            return user.scalars().first()
+        user = await self._execute_read(
+            select(UserORM).where(UserORM.telegram_id == telegram_id)
+        )
+        return user.scalars().first()
+
+    async def upsert_user(self, instance: UserORM) -> tuple[UserORM, bool]:
+        """Creates the user or refreshes the names of the existing one.
+
+        A single INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement,
+        so the concurrent first updates of a user never fail on
+        the unique telegram_id. Returns the user and whether it has been created.
+        """
+        session = self._session
+        values = {
+            "telegram_id": instance.telegram_id,
+            "is_bot": instance.is_bot,
+            "first_name": instance.first_name,
+            "last_name": instance.last_name,
+            "username": instance.username,
+            "language_code": instance.language_code,
+        }
+        stmt = insert(UserORM).values(**values)
+        query = await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[UserORM.telegram_id],
+                set_={
+                    "first_name": stmt.excluded.first_name,
+                    "last_name": stmt.excluded.last_name,
+                    "username": stmt.excluded.username,
+                    "language_code": stmt.excluded.language_code,
+                    "updated_at": func.now(),
+                },
+            ).returning(
+                UserORM,
+                # xmax is only zero for the rows inserted by the statement
+                literal_column("xmax = 0").label("created"),
+            ),
+            execution_options={"populate_existing": True},
+        )
+        user, created = query.one()
+        return user, created
 
 
 class CRUDRecents(CRUDBase):
@@ -39,100 +123,149 @@ class CRUDRecents(CRUDBase):
     A route needs to be in the recents to be added to favorites.
     """
 
-    def __init__(self, session: AsyncSession = async_session_factory()):
+    def __init__(self):
         """Initializes CRUDRecents class instance."""
-        super().__init__(RecentORM, session)
+        super().__init__(RecentORM)
 
     async def get_recent_or_fav_by_user_id(
         self, user_id: int, fav: bool = False
-    ) -> Sequence[RecentORM]:
+    ) -> list[RecentListItem]:
         """Gets recent or favorite by user ID."""
-        async with self._session as session:
-            selection = (
-                select(RecentORM)
-                .where(RecentORM.user_id == user_id)
-                .join(RouteORM)
-                .options(
-                    joinedload(RecentORM.route).joinedload(RouteORM.departure_point)
-                )
-                .options(
-                    joinedload(RecentORM.route).joinedload(RouteORM.destination_point)
-                )
-            )
-            if fav:
-                selection = selection.where(RecentORM.favorite == True)  # noqa
-            result = await session.execute(
-                selection.order_by(
-                    desc(RecentORM.count), desc(RecentORM.updated_at)
-                ).limit(settings.RECENT_FAV_LIST_LENGTH)
-            )
-            return result.scalars().unique().all()
+        listing = FAVORITES_LISTING if fav else RECENTS_LISTING
+        return await self._get_recents_listing(listing, user_id=user_id)
+
+    async def get_recent_not_in_fav_by_user_id(
+        self, user_id: int
+    ) -> list[RecentListItem]:
+        """Gets the recents of the user that are not in favorites yet.
+
+        Favorites are the recents with the 'favorite' flag, so the anti-join
+        of the recents and the favorites is a filter on the flag.
+        """
+        return await self._get_recents_listing(NOT_FAVORITES_LISTING, user_id=user_id)
+
+    async def _get_recents_listing(
+        self, listing: Select, user_id: int
+    ) -> list[RecentListItem]:
+        """Gets the most used recents of the user as the listing rows."""
+        result = await self._execute_read(
+            listing, params={"user_id": user_id}, on_primary=True
+        )
+        return [RecentListItem._make(row) for row in result]
 
     async def route_in_recent(self, user_id: int, route_id: int) -> RecentORM | None:
         """Checks if a route is in the recents of a user."""
-        async with self._session as session:
-            query = await session.execute(
-                select(RecentORM).where(
-                    and_(RecentORM.user_id == user_id, RecentORM.route_id == route_id)
-                )
+        query = await self._execute_read(
+            select(RecentORM).where(
+                and_(RecentORM.user_id == user_id, RecentORM.route_id == route_id)
+            ),
+            on_primary=True,
+        )
+        return query.scalars().first()
+
+    async def upsert_recent(self, user_id: int, route_id: int) -> RecentORM:
+        """Adds the route to the recents of the user or bumps the existing recent.
+
+        A single INSERT ... ON CONFLICT DO UPDATE ... RETURNING statement,
+        so the concurrent calls for the same recent never fail on
+        the uq_user_recent constraint.
+        """
+        session = self._session
+        query = await session.scalars(
+            insert(RecentORM)
+            .values(user_id=user_id, route_id=route_id, count=1)
+            .on_conflict_do_update(
+                constraint="uq_user_recent",
+                set_={"count": RecentORM.count + 1, "updated_at": func.now()},
             )
-            return query.scalars().first()
+            .returning(RecentORM),
+            execution_options={"populate_existing": True},
+        )
+        return query.one()
 
     async def update_recent(self, recent_id: int) -> RecentORM:
-        """Updates recent 'count' and 'updated_at'."""
-        async with self._session as session:
-            stmt = (
-                update(RecentORM)
-                .where(RecentORM.id == recent_id)
-                .values(count=RecentORM.count + 1)
+        """Updates recent 'count' and 'updated_at'.
+
+        Returns the updated recent with its route and both route points,
+        all in a single UPDATE ... RETURNING statement.
+        """
+        session = self._session
+        updated_recent = (
+            update(RecentORM)
+            .where(RecentORM.id == recent_id)
+            .values(count=RecentORM.count + 1)
+            .returning(*RecentORM.__table__.columns)
+            .cte("updated_recent")
+        )
+        recent_alias = aliased(RecentORM, updated_recent)
+        query = await session.execute(
+            select(recent_alias)
+            .options(
+                joinedload(recent_alias.route).joinedload(RouteORM.departure_point),
+                joinedload(recent_alias.route).joinedload(RouteORM.destination_point),
             )
-            await session.execute(stmt)
-            await session.commit()
-            try:
-                recent_db_new: RecentORM = await self.get_or_raise(_id=recent_id)
-            except exc.NoDBObjectError as e:
-                logger.exception(e)
-                await send_email_async(e)
-                raise e
-            return recent_db_new
+            .execution_options(populate_existing=True)
+        )
+        recent = query.scalars().first()
+        if not recent:
+            e = exc.NoDBObjectError(f"Recent with ID {recent_id} does not exist.")
+            logger.exception(e)
+            await send_email_async(e)
+            raise e
+        return recent
 
     async def _get_recent_with_route(self, recent_id: int) -> RecentORM:
         """Gets recent with route."""
-        async with self._session as session:
-            query = await session.execute(
-                select(RecentORM)
-                .where(RecentORM.id == recent_id)
-                .options(
-                    joinedload(RecentORM.route).joinedload(RouteORM.departure_point)
-                )
-                .options(
-                    joinedload(RecentORM.route).joinedload(RouteORM.destination_point)
-                )
-            )
-            recent = query.scalars().first()
-            if not recent:
-                raise exc.NoDBObjectError(f"Recent with ID {recent_id} does not exist.")
-            return recent
+        session = self._session
+        query = await session.execute(
+            select(RecentORM)
+            .where(RecentORM.id == recent_id)
+            .options(joinedload(RecentORM.route).joinedload(RouteORM.departure_point))
+            .options(joinedload(RecentORM.route).joinedload(RouteORM.destination_point))
+            .execution_options(populate_existing=True)
+        )
+        recent = query.scalars().first()
+        if not recent:
+            raise exc.NoDBObjectError(f"Recent with ID {recent_id} does not exist.")
+        return recent
 
     async def _add_or_delete_from_fav(
         self, recent_id: int, adding: bool = True
     ) -> RecentORM:
         """Adds or deletes a recent from favorites."""
-        async with self._session as session:
-            stmt = (
-                update(RecentORM)
-                .where(RecentORM.id == recent_id)
-                .values(favorite=adding)
+        session = self._session
+        stmt = (
+            update(RecentORM).where(RecentORM.id == recent_id).values(favorite=adding)
+        )
+        await session.execute(stmt)
+        await session.flush()
+        try:
+            recent_db_new: RecentORM = await self._get_recent_with_route(
+                recent_id=recent_id
+            )
+        except exc.NoDBObjectError as e:
+            raise e
+        return recent_db_new
+
+    async def add_recents_to_fav(self, user_id: int, recent_ids: list[int]) -> int:
+        """Adds the recents of the user to favorites in a single UPDATE.
+
+        Returns the number of the recents added.
+        """
+        session = self._session
+        # A single array parameter, so the statement is the same for any number of IDs
+        ids = bindparam("recent_ids", recent_ids, type_=ARRAY(Integer))
+        result = await session.execute(
+            update(RecentORM)
+            .where(
+                RecentORM.id == any_(ids),
+                RecentORM.user_id == user_id,
+                RecentORM.favorite == False,  # noqa
             )
-            await session.execute(stmt)
-            await session.commit()
-            try:
-                recent_db_new: RecentORM = await self._get_recent_with_route(
-                    recent_id=recent_id
-                )
-            except exc.NoDBObjectError as e:
-                raise e
-            return recent_db_new
+            .values(favorite=True)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
 
     async def add_recent_to_fav(self, recent_id: int) -> RecentORM:
         """Adds a recent to favorites."""
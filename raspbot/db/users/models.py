@@ -5,6 +5,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
@@ -56,7 +57,10 @@ class RouteORM(RouteStrMixin, BaseUserRouteORM):
     departure_point: Mapped["PointORM"] = relationship(
         "PointORM", foreign_keys=[departure_point_id]
     )
-    destination_point_id: Mapped[int] = mapped_column(ForeignKey("points.id"))
+    # The departure point is covered by the uq_departure_destination index
+    destination_point_id: Mapped[int] = mapped_column(
+        ForeignKey("points.id"), index=True
+    )
     destination_point: Mapped["PointORM"] = relationship(
         "PointORM", foreign_keys=[destination_point_id]
     )
@@ -89,3 +93,23 @@ class RecentORM(BaseUserRouteORM):
     route: Mapped["RouteORM"] = relationship("RouteORM", back_populates="recents_list")
 
     __table_args__ = (UniqueConstraint("user_id", "route_id", name="uq_user_recent"),)
+
+
+# The recents and favorites listings: the recents of a user (optionally only
+# the favorite or only the non-favorite ones) with the most used first.
+# route_id is included so that the join to routes does not need the table rows.
+Index(
+    "ix_recents_user_id_favorite_count_updated_at",
+    RecentORM.user_id,
+    RecentORM.favorite,
+    RecentORM.count.desc(),
+    RecentORM.updated_at.desc(),
+    postgresql_include=["route_id"],
+)
+Index(
+    "ix_recents_user_id_count_updated_at",
+    RecentORM.user_id,
+    RecentORM.count.desc(),
+    RecentORM.updated_at.desc(),
+    postgresql_include=["route_id"],
+)
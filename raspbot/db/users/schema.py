@@ -0,0 +1,57 @@
+from typing import NamedTuple
+
+from raspbot.db.routes.schema import get_route_description
+from raspbot.db.stations.models import PointTypeEnum
+from raspbot.services.shorteners import shorten_route_description
+from raspbot.settings import settings
+
+
+class UserSnapshot(NamedTuple):
+    """User as the handlers see it.
+
+    Immutable and detached from any session, so it can be cached and shared
+    by the concurrent updates.
+    """
+
+    id: int
+    telegram_id: int
+    first_name: str
+    last_name: str | None
+
+    @property
+    def full_name(self) -> str:
+        """Full name of the user."""
+        if self.last_name:
+            return f"{self.first_name} {self.last_name}"
+        return self.first_name
+
+
+class RecentListItem(NamedTuple):
+    """Row of the recents and favorites listings.
+
+    Has just what the listing keyboards show, so no ORM objects are built.
+    """
+
+    id: int
+    route_id: int
+    favorite: bool
+    departure_type: PointTypeEnum
+    departure_title: str
+    destination_type: PointTypeEnum
+    destination_title: str
+
+    def __str__(self) -> str:
+        """Route string representation."""
+        return get_route_description(
+            departure_type=self.departure_type,
+            departure_title=self.departure_title,
+            destination_type=self.destination_type,
+            destination_title=self.destination_title,
+        )
+
+    @property
+    def short(self) -> str:
+        """Shortened route string representation."""
+        return shorten_route_description(
+            route_descr=self.__str__(), limit=settings.ROUTE_INLINE_LIMIT
+        )
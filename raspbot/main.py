@@ -1,5 +1,6 @@
 import argparse
 import asyncio
+import contextlib
 import os
 import sys
 
@@ -9,15 +10,21 @@ parent_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
+from aiogram import Bot  # noqa
 from aiogram.exceptions import TelegramRetryAfter  # noqa
 
 from raspbot.bot.bot import get_bot, start_bot  # noqa
 from raspbot.core.logging import configure_logging  # noqa
+from raspbot.core.metrics import report_metrics  # noqa
 from raspbot.db.stations.schedule import (  # noqa
     check_last_station_db_update,
     get_scheduler,
     start_update_monitoring,
 )
+from raspbot.services.point_cache import (  # noqa
+    refresh_point_caches,
+    watch_station_data_generation,
+)
 
 logger = configure_logging(__name__)
 
@@ -38,7 +45,23 @@ async def main() -> None:
     """Entrypoint starting all the things."""
     args = get_args()
     bot = get_bot(test=args.test)
-    if args.nomonitor:
+    await refresh_point_caches()
+    background_tasks = (
+        asyncio.create_task(report_metrics()),
+        asyncio.create_task(watch_station_data_generation()),
+    )
+    try:
+        await _run_bot(bot=bot, nomonitor=args.nomonitor)
+    finally:
+        for task in background_tasks:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+async def _run_bot(bot: Bot, nomonitor: bool) -> None:
+    """Runs the bot, with the update monitoring unless nomonitor is set."""
+    if nomonitor:
         await start_bot(bot)
     else:
         await check_last_station_db_update()
@@ -0,0 +1,117 @@
+"""In-memory spatial index over the stations for the nearest station search.
+
+The stations are put into the cells of a regular latitude / longitude grid.
+The search looks through the rings of cells around the cell of the user
+location, nearest rings first, and stops as soon as no station in the farther
+rings can be closer than the stations already found.
+"""
+
+import heapq
+import math
+from typing import Iterable
+
+from raspbot.db.routes.schema import PointResponsePD
+from raspbot.settings import settings
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Roughly 5.5 km along the meridian
+GRID_CELL_DEGREES = 0.05
+# The columns wrap around at the antimeridian
+LONGITUDE_CELLS = round(360 / GRID_CELL_DEGREES)
+
+Cell = tuple[int, int]
+Location = tuple[float, float, PointResponsePD]
+
+
+def get_distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Returns the great-circle distance between two locations in kilometers."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    hav = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(hav))
+
+
+def _get_cell(latitude: float, longitude: float) -> Cell:
+    """Returns the grid cell containing the location."""
+    return (
+        math.floor(latitude / GRID_CELL_DEGREES),
+        math.floor(longitude / GRID_CELL_DEGREES) % LONGITUDE_CELLS,
+    )
+
+
+def _get_ring(center: Cell, radius: int) -> Iterable[Cell]:
+    """Returns the cells on the border of the square of cells around the center."""
+    row, column = center
+    if radius == 0:
+        yield center
+        return
+    for column_shift in range(-radius, radius + 1):
+        yield row - radius, (column + column_shift) % LONGITUDE_CELLS
+        yield row + radius, (column + column_shift) % LONGITUDE_CELLS
+    for row_shift in range(-radius + 1, radius):
+        yield row + row_shift, (column - radius) % LONGITUDE_CELLS
+        yield row + row_shift, (column + radius) % LONGITUDE_CELLS
+
+
+class StationGrid:
+    """Grid index over the station locations."""
+
+    def __init__(self, locations: Iterable[Location]):
+        """Initializes StationGrid class instance."""
+        self._cells: dict[Cell, list[Location]] = {}
+        self._size = 0
+        for location in locations:
+            latitude, longitude, _ = location
+            self._cells.setdefault(_get_cell(latitude, longitude), []).append(location)
+            self._size += 1
+
+    def __len__(self) -> int:
+        """Returns the number of stations in the index."""
+        return self._size
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int = settings.NEAREST_STATIONS_LIMIT,
+        max_distance_km: float = settings.NEAREST_STATIONS_MAX_DISTANCE_KM,
+    ) -> list[tuple[PointResponsePD, float]]:
+        """Gets the stations nearest to the location with the distances in km.
+
+        Only the stations not farther than max_distance_km are returned,
+        nearest first.
+        """
+        center = _get_cell(latitude, longitude)
+        # The narrowest side of a cell within the search area: a station outside
+        # of the ring N is at least N such sides away from the location
+        farthest_latitude = min(
+            abs(latitude) + max_distance_km / KM_PER_DEGREE + GRID_CELL_DEGREES, 89.0
+        )
+        cell_km = (
+            GRID_CELL_DEGREES
+            * KM_PER_DEGREE
+            * math.cos(math.radians(farthest_latitude))
+        )
+        # A wider ring would visit the same columns twice
+        max_radius = min(
+            math.ceil(max_distance_km / cell_km), (LONGITUDE_CELLS - 1) // 2
+        )
+        found: list[tuple[float, int, PointResponsePD]] = []
+        for radius in range(max_radius + 1):
+            for cell in _get_ring(center, radius):
+                for station_lat, station_lon, point in self._cells.get(cell, ()):
+                    distance = get_distance_km(
+                        latitude, longitude, station_lat, station_lon
+                    )
+                    if distance <= max_distance_km:
+                        found.append((distance, point.id, point))
+            if len(found) >= limit:
+                nearest = heapq.nsmallest(limit, found)
+                if nearest[-1][0] <= radius * cell_km:
+                    break
+        return [
+            (point, distance) for distance, _, point in heapq.nsmallest(limit, found)
+        ]
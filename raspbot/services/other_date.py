@@ -1,10 +1,9 @@
 import calendar as cal
 import datetime as dt
-import locale
 import re
 
 from dateutil import parser
-from dateutil.relativedelta import relativedelta
+from dateutil.relativedelta import MO, relativedelta
 
 from raspbot.bot.constants import messages as msg
 from raspbot.core import exceptions as exc
@@ -12,26 +11,12 @@ from raspbot.core.logging import configure_logging, log
 from raspbot.db.models import RouteORM
 from raspbot.db.routes.schema import RouteResponsePD
 from raspbot.services.endings import days_with_ending
+from raspbot.services.prettify_datetimes import format_date
 from raspbot.services.timetable import Timetable
 from raspbot.settings import settings
 
 logger = configure_logging(name=__name__)
 
-locale.setlocale(locale.LC_TIME, "ru_RU.UTF-8")
-
-SPECIFIC_WORDS: dict[str, dt.date | str] = {
-    "послезавтра": dt.date.today() + dt.timedelta(2),
-    "завтра": dt.date.today() + dt.timedelta(1),
-    "сегодня": dt.date.today(),
-    "позавчера": msg.NO_TIMETABLE_IN_THE_PAST.format(
-        date=(dt.date.today() - dt.timedelta(2)).strftime("%d %B %Y")
-    ),
-    "вчера": msg.NO_TIMETABLE_IN_THE_PAST.format(
-        date=(dt.date.today() - dt.timedelta(1)).strftime("%d %B %Y")
-    ),
-}
-
-
 MONTHS_IN_PREP_CASE = {
     1: "январе",
     2: "феврале",
@@ -98,12 +83,82 @@ class CustomParserInfoYearFirst(CustomParserInfo):
         self.yearfirst = yearfirst
 
 
+# Parserinfo objects are stateless, so they are built once and reused
+# by the dateutil fallback instead of being constructed for every user input.
+DAYFIRST_PARSERINFO = CustomParserInfoDayFirst()
+YEARFIRST_PARSERINFO = CustomParserInfoYearFirst()
+
+RELATIVE_WORDS = ("послезавтра", "позавчера", "завтра", "сегодня", "вчера")
+
+# Accusative forms are accepted on top of the parserinfo ones: "в среду".
+_WEEKDAY_NUMBERS: dict[str, int] = {
+    **{
+        word: number
+        for number, words in enumerate(CustomParserInfo.WEEKDAYS)
+        for word in words
+    },
+    "среду": 2,
+    "пятницу": 4,
+    "субботу": 5,
+}
+_MONTH_NUMBERS: dict[str, int] = {
+    word: number
+    for number, words in enumerate(CustomParserInfo.MONTHS, start=1)
+    for word in words
+}
+
+
+def _alternatives(words) -> str:
+    """Joins the words into a regex alternation, longest first."""
+    return "|".join(sorted(words, key=len, reverse=True))
+
+
+DATE_GRAMMAR = re.compile(
+    rf"""
+    (?:на\s+)?
+    (?:
+        (?P<relative>{_alternatives(RELATIVE_WORDS)})
+      | (?:во?\s+)?(?P<next_week>следующ(?:ий|ую|ее|ая)\s+)?
+        (?P<weekday>{_alternatives(_WEEKDAY_NUMBERS)})
+      | (?P<day>\d{{1,2}})\s*(?P<month>{_alternatives(_MONTH_NUMBERS)})
+        (?:\W+(?P<month_year>\d{{4}}|\d{{2}}))?
+      | (?P<first>\d{{1,4}})\W+(?P<second>\d{{1,2}})(?:\W+(?P<third>\d{{1,4}}))?
+      | (?P<number>\d{{1,2}})
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+def _get_specific_words(today: dt.date | None = None) -> dict[str, dt.date | str]:
+    """Returns the relative date words mapped to dates or error messages.
+
+    The dates are calculated on every call so that a long-running process
+    does not keep serving yesterday's dates after midnight.
+    """
+    if not today:
+        today = dt.date.today()
+    return {
+        "послезавтра": today + dt.timedelta(2),
+        "завтра": today + dt.timedelta(1),
+        "сегодня": today,
+        "позавчера": msg.NO_TIMETABLE_IN_THE_PAST.format(
+            date=format_date(today - dt.timedelta(2))
+        ),
+        "вчера": msg.NO_TIMETABLE_IN_THE_PAST.format(
+            date=format_date(today - dt.timedelta(1))
+        ),
+    }
+
+
 @log(logger)
 def _check_specific_words(
     user_raw_date_input: str,
-    specific_words: dict[str, dt.date | str] = SPECIFIC_WORDS,
+    specific_words: dict[str, dt.date | str] | None = None,
 ) -> dt.date | None:
     """Checks if there is a specific word in user input and returns the date if so."""
+    if specific_words is None:
+        specific_words = _get_specific_words()
     for key, value in specific_words.items():
         if key in user_raw_date_input:
             if isinstance(value, dt.date):
@@ -157,17 +212,14 @@ def _check_number(user_raw_date_input: str) -> dt.date | None:
         if number == (today - relativedelta(days=n)).day:
             raise exc.InvalidDateUserInputError(
                 msg.NO_TIMETABLE_IN_THE_PAST.format(
-                    date=(today - relativedelta(days=n)).strftime("%d %B %Y")
+                    date=format_date(today - relativedelta(days=n))
                 )
             )
-    try:
-        parsed_date = parser.parse(timestr=user_date_input, dayfirst=True).date()
-    except parser.ParserError as e:
-        logger.error(f"{e.__class__.__name__.upper()}: {str(e)}")
-        raise exc.InvalidDateUserInputError(msg.COULD_NOT_PARSE_DATE)
+    # The number has been validated against the current month above
+    parsed_date = today.replace(day=number)
 
     if parsed_date < today:
-        return today + relativedelta(months=1, day=today.day)
+        return today + relativedelta(months=1, day=number)
     return parsed_date
 
 
@@ -194,7 +246,7 @@ def _get_validated_date(
     no_past = [r for r in dates if r >= today - relativedelta(days=max_days_into_past)]
     if not no_past:
         raise exc.InvalidDateUserInputError(
-            msg.NO_TIMETABLE_IN_THE_PAST.format(date=dates[0].strftime("%d %B %Y"))
+            msg.NO_TIMETABLE_IN_THE_PAST.format(date=format_date(dates[0]))
         )
 
     # Remove all dates more than X months in the future from the list of dates
@@ -205,7 +257,7 @@ def _get_validated_date(
     if not no_future:
         raise exc.InvalidDateUserInputError(
             msg.TOO_FAR_INTO_FUTURE.format(
-                date=no_past[0].strftime("%d %B %Y"),
+                date=format_date(no_past[0]),
                 max_months_into_future=str(max_months_into_future),
             )
         )
@@ -224,7 +276,7 @@ def _parse_date(date_string: str) -> dt.date | None:
     """Parses a date string into a datetime.date object."""
     results = []
     # Try two approaches to parse the date string: 1. DayFirst; 2. YearFirst
-    for parser_obj in (CustomParserInfoDayFirst(), CustomParserInfoYearFirst()):
+    for parser_obj in (DAYFIRST_PARSERINFO, YEARFIRST_PARSERINFO):
         try:
             results.append(
                 parser.parse(timestr=date_string, parserinfo=parser_obj).date()
@@ -249,6 +301,78 @@ def _parse_date(date_string: str) -> dt.date | None:
     return _get_validated_date(dates=results)
 
 
+def _get_numeric_candidates(
+    first: str, second: str, third: str | None, today: dt.date
+) -> list[dt.date]:
+    """Resolves the numeric date shapes into the candidate dates.
+
+    Raises ValueError if the numbers do not form a valid date.
+    """
+    if third is None:
+        # dd.mm - the day always comes first
+        return [dt.date(today.year, int(second), int(first))]
+    if len(first) == 4:
+        # yyyy.mm.dd
+        return [dt.date(int(first), int(second), int(third))]
+    if len(third) == 4:
+        # dd.mm.yyyy
+        return [dt.date(int(third), int(second), int(first))]
+    if len(first) > 2 or len(third) > 2:
+        raise ValueError(f"Unsupported numeric date: {first}.{second}.{third}")
+    # dd.mm.yy is ambiguous with yy.mm.dd: both are returned, DayFirst first,
+    # the same way the dateutil fallback does it.
+    return [
+        dt.date(DAYFIRST_PARSERINFO.convertyear(int(third)), int(second), int(first)),
+        dt.date(YEARFIRST_PARSERINFO.convertyear(int(first)), int(second), int(third)),
+    ]
+
+
+@log(logger)
+def _match_date_grammar(user_raw_date_input: str) -> dt.date | None:
+    """Resolves the common date shapes with a single precompiled regex.
+
+    Returns None if the input does not match the grammar or does not form
+    a valid date, so that the caller can fall back to dateutil.
+    """
+    user_date_input = " ".join(user_raw_date_input.lower().replace("ё", "е").split())
+    match = DATE_GRAMMAR.fullmatch(user_date_input.strip(" .,!?"))
+    if not match:
+        return None
+
+    today = dt.date.today()
+    groups = match.groupdict()
+    if groups["relative"]:
+        return _check_specific_words(
+            groups["relative"], specific_words=_get_specific_words(today)
+        )
+    if groups["weekday"]:
+        weekday = _WEEKDAY_NUMBERS[groups["weekday"]]
+        if groups["next_week"]:
+            # "В следующий вторник" is the tuesday of the next calendar week
+            next_monday = today + relativedelta(days=1, weekday=MO)
+            return next_monday + relativedelta(weekday=weekday)
+        return today + relativedelta(weekday=weekday)
+    if groups["number"]:
+        return _check_number(groups["number"])
+
+    try:
+        if groups["month"]:
+            year = (
+                DAYFIRST_PARSERINFO.convertyear(int(groups["month_year"]))
+                if groups["month_year"]
+                else today.year
+            )
+            dates = [dt.date(year, _MONTH_NUMBERS[groups["month"]], int(groups["day"]))]
+        else:
+            dates = _get_numeric_candidates(
+                groups["first"], groups["second"], groups["third"], today
+            )
+    except ValueError:
+        return None
+
+    return _get_validated_date(dates=dates)
+
+
 @log(logger)
 def get_timetable_by_date(
     route: RouteORM | RouteResponsePD, user_raw_date_input: str
@@ -265,13 +389,13 @@ def get_timetable_by_date(
     Returns:
         A Timetable object.
     """
-    date = None
+    date = _match_date_grammar(user_raw_date_input)
+
     check_funcs = (_check_specific_words, _check_number)
     for func in check_funcs:
-        result = func(user_raw_date_input)
-        if result:
-            date = result
+        if date:
             break
+        date = func(user_raw_date_input)
 
     if not date:
         user_date_input = _replace_symbols_with_slashes(user_raw_date_input)
@@ -0,0 +1,200 @@
+"""Caches of the point search results and of the points by ID.
+
+The points only change when the stations DB is repopulated, and every
+population adds a row to LastUpdatedORM. The ID of the latest such row
+is used as the generation of the station data: the caches are dropped
+as soon as the generation changes.
+"""
+
+import asyncio
+from collections import OrderedDict
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from raspbot.core.logging import configure_logging, log
+from raspbot.db.base import session_scope, use_primary
+from raspbot.db.routes.schema import PointResponsePD
+from raspbot.db.stations.crud import CRUDLastUpdated
+from raspbot.services.point_index import get_point_index, load_point_index
+from raspbot.settings import settings
+
+logger = configure_logging(name=__name__)
+
+PointChunks = list[list[PointResponsePD]]
+
+
+class PointSearchCache:
+    """LRU cache of the ranked point chunks by the normalized user query.
+
+    Negative results (nothing found) are cached as None.
+    """
+
+    def __init__(self, maxsize: int = settings.POINT_SEARCH_CACHE_SIZE):
+        """Initializes PointSearchCache class instance."""
+        self._maxsize = maxsize
+        self.generation: int | None = None
+        self._results: OrderedDict[
+            str, tuple[tuple[PointResponsePD, ...], ...] | None
+        ] = OrderedDict()
+
+    def __contains__(self, query: str) -> bool:
+        """Checks if there is a cached result for the query."""
+        return query in self._results
+
+    def get(self, query: str) -> PointChunks | None:
+        """Gets the cached chunks for the query, None for a negative result.
+
+        Callers get a fresh copy, so they are free to modify the returned list.
+        """
+        self._results.move_to_end(query)
+        chunks = self._results[query]
+        if chunks is None:
+            return None
+        return [list(chunk) for chunk in chunks]
+
+    def put(
+        self, query: str, chunks: PointChunks | None, generation: int | None
+    ) -> None:
+        """Caches the chunks for the query, evicting the least recently used.
+
+        generation is the station data generation the chunks have been found
+        under. They are not cached if the generation has changed since.
+        """
+        if generation != self.generation:
+            return
+        self._results[query] = (
+            tuple(tuple(chunk) for chunk in chunks) if chunks else None
+        )
+        self._results.move_to_end(query)
+        if len(self._results) > self._maxsize:
+            self._results.popitem(last=False)
+
+    def clear(self, generation: int | None) -> int:
+        """Drops all the cached results and returns their number.
+
+        Only the results of the new station data generation are cached from now on.
+        """
+        dropped = len(self._results)
+        self._results.clear()
+        self.generation = generation
+        return dropped
+
+
+class PointCache:
+    """LRU cache of the ready PointResponsePD objects by point ID."""
+
+    def __init__(self, maxsize: int = settings.POINT_CACHE_SIZE):
+        """Initializes PointCache class instance."""
+        self._maxsize = maxsize
+        self.generation: int | None = None
+        self._points: OrderedDict[int, PointResponsePD] = OrderedDict()
+
+    def get(self, point_id: int) -> PointResponsePD | None:
+        """Gets the cached point by its ID, or None if it is not cached."""
+        point = self._points.get(point_id)
+        if point is not None:
+            self._points.move_to_end(point_id)
+        return point
+
+    def put(self, point: PointResponsePD, generation: int | None) -> None:
+        """Caches the point, evicting the least recently used.
+
+        generation is the station data generation the point has been fetched
+        under. It is not cached if the generation has changed since.
+        """
+        if generation != self.generation:
+            return
+        self._points[point.id] = point
+        self._points.move_to_end(point.id)
+        if len(self._points) > self._maxsize:
+            self._points.popitem(last=False)
+
+    def clear(self, generation: int | None) -> int:
+        """Drops all the cached points and returns their number.
+
+        Only the points of the new station data generation are cached from now on.
+        """
+        dropped = len(self._points)
+        self._points.clear()
+        self.generation = generation
+        return dropped
+
+
+point_search_cache = PointSearchCache()
+point_cache = PointCache()
+_generation: int | None = None
+
+crud_last_updated = CRUDLastUpdated()
+
+
+def get_generation() -> int | None:
+    """Returns the current station data generation.
+
+    Read once at the start of a lookup and passed to the cache put, so that
+    a result fetched under the old data is never cached under the new one.
+    """
+    return _generation
+
+
+def set_generation(generation: int | None) -> None:
+    """Drops the point caches if the station data generation has changed."""
+    global _generation
+    if generation != _generation:
+        dropped_searches = point_search_cache.clear(generation)
+        dropped_points = point_cache.clear(generation)
+        logger.info(
+            f"Station data generation changed from {_generation} to {generation}. "
+            f"Dropped {dropped_searches} cached point searches "
+            f"and {dropped_points} cached points."
+        )
+        _generation = generation
+
+
+@log(logger)
+def get_cached_point(point_id: int) -> PointResponsePD | None:
+    """Gets the point by ID from the point index or the point cache.
+
+    The index has all the current points, the cache keeps the points that
+    had to be fetched from the DB, e.g. the outdated points of the old routes.
+    """
+    point_index = get_point_index()
+    if point_index is not None:
+        point = point_index.get(point_id)
+        if point is not None:
+            return point
+    return point_cache.get(point_id)
+
+
+@log(logger)
+async def refresh_point_caches() -> None:
+    """Reloads the point index and drops the outdated point caches.
+
+    Called at startup and after each stations DB population of the bot.
+    """
+    async with session_scope():
+        # The refresh follows the population on the primary, which the read
+        # replica may not have caught up with yet
+        use_primary()
+        # Read first, so that the generation is never newer than the loaded points
+        generation = await crud_last_updated.get_latest_id()
+        await load_point_index()
+        set_generation(generation)
+
+
+async def watch_station_data_generation(
+    interval_minutes: int = settings.STATION_DATA_CHECK_INTERVAL_MINUTES,
+) -> None:
+    """Refreshes the point caches every time the generation changes.
+
+    Picks up the stations DB populations run outside of the bot, e.g. with
+    python -m raspbot.db.stations.parse, checking every interval_minutes.
+    """
+    while True:
+        await asyncio.sleep(interval_minutes * 60)
+        try:
+            async with session_scope():
+                generation = await crud_last_updated.get_latest_id()
+            if generation != get_generation():
+                await refresh_point_caches()
+        except (OSError, SQLAlchemyError) as e:
+            logger.warning(f"Failed to check the station data generation: {e}")
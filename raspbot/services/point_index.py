@@ -0,0 +1,214 @@
+"""In-memory search index over the points (stations and settlements).
+
+The points only change when the stations DB is repopulated, so the whole set
+of searchable points is kept in the bot process and the point search does not
+need to hit the DB. The index is loaded at startup and rebuilt after each DB
+population; the rebuilt index replaces the old one in a single assignment,
+so the searches running at that moment keep using the old one.
+"""
+
+import bisect
+import time
+from collections import Counter
+from typing import Iterable
+
+from raspbot.core.logging import configure_logging, log
+from raspbot.db.models import PointTypeEnum
+from raspbot.db.routes.crud import CRUDPoints
+from raspbot.db.routes.schema import PointResponsePD
+from raspbot.services.nearest_points import StationGrid
+from raspbot.services.strip import normalize_title
+from raspbot.settings import settings
+
+logger = configure_logging(name=__name__)
+
+crud_points = CRUDPoints()
+
+# Same default as pg_trgm.similarity_threshold
+SIMILARITY_THRESHOLD = 0.3
+
+
+def _get_trigrams(text: str) -> set[str]:
+    """Returns the set of all the three-character substrings of the text."""
+    return {"".join(chars) for chars in zip(text, text[1:], text[2:])}
+
+
+class PointSearchIndex:
+    """Search index over the points.
+
+    The normalized titles are kept in a sorted array for the exact and prefix
+    lookups, and every title is also indexed by its trigrams for the lookups
+    of a substring anywhere in the title and for the similarity search.
+    """
+
+    def __init__(self, points: Iterable[PointResponsePD]):
+        """Initializes PointSearchIndex class instance."""
+        entries = sorted(
+            ((normalize_title(point.title), point) for point in points),
+            key=lambda entry: (entry[0], entry[1].id),
+        )
+        self._titles: list[str] = [title for title, _ in entries]
+        self._points: list[PointResponsePD] = [point for _, point in entries]
+        self._points_by_id: dict[int, PointResponsePD] = {
+            point.id: point for point in self._points
+        }
+        self._trigrams: dict[str, list[int]] = {}
+        self._trigram_counts: list[int] = []
+        for position, title in enumerate(self._titles):
+            # Padding adds the trigrams marking the beginning and the end of a title
+            trigrams = _get_trigrams(f" {title} ")
+            self._trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self._trigrams.setdefault(trigram, []).append(position)
+
+    def __len__(self) -> int:
+        """Returns the number of points in the index."""
+        return len(self._points)
+
+    def get(self, point_id: int) -> PointResponsePD | None:
+        """Gets the point by its ID, or None if it is not in the index."""
+        return self._points_by_id.get(point_id)
+
+    def exact(self, query: str) -> list[PointResponsePD]:
+        """Gets the points with the title equal to the query."""
+        query = normalize_title(query)
+        start = bisect.bisect_left(self._titles, query)
+        stop = bisect.bisect_right(self._titles, query, lo=start)
+        return self._points[start:stop]
+
+    def startswith(self, query: str) -> list[PointResponsePD]:
+        """Gets the points with the title starting with the query."""
+        query = normalize_title(query)
+        start = bisect.bisect_left(self._titles, query)
+        stop = bisect.bisect_left(self._titles, f"{query}\U0010ffff", lo=start)
+        return self._points[start:stop]
+
+    def _contains_positions(self, query: str) -> list[int]:
+        """Gets the positions of the titles containing the normalized query."""
+        trigrams = _get_trigrams(query)
+        if not trigrams:
+            positions: Iterable[int] = range(len(self._titles))
+        else:
+            posting_lists = [self._trigrams.get(trigram, []) for trigram in trigrams]
+            # Every match has all the trigrams of the query, so it is enough
+            # to check the candidates from the shortest posting list
+            positions = min(posting_lists, key=len)
+        return [position for position in positions if query in self._titles[position]]
+
+    def contains(self, query: str) -> list[PointResponsePD]:
+        """Gets the points with the query anywhere in the title, in title order."""
+        return [
+            self._points[position]
+            for position in self._contains_positions(normalize_title(query))
+        ]
+
+    def similar(
+        self, query: str, threshold: float = SIMILARITY_THRESHOLD, limit: int = 30
+    ) -> list[PointResponsePD]:
+        """Gets the points with the titles similar to the query, most similar first.
+
+        The similarity is the share of the common trigrams, as in pg_trgm.
+        """
+        trigrams = _get_trigrams(f" {normalize_title(query)} ")
+        common: Counter[int] = Counter()
+        for trigram in trigrams:
+            common.update(self._trigrams.get(trigram, []))
+        scored = []
+        for position, shared in common.items():
+            similarity = shared / (
+                len(trigrams) + self._trigram_counts[position] - shared
+            )
+            if similarity >= threshold:
+                scored.append((-similarity, position))
+        scored.sort()
+        return [self._points[position] for _, position in scored[:limit]]
+
+    def search(
+        self,
+        query: str,
+        strict_search: bool = False,
+        limit: int = settings.POINT_SEARCH_LIMIT,
+    ) -> list[PointResponsePD]:
+        """Searches the points by title, best matches first.
+
+        Ranks the points the same way as CRUDPoints.get_points_by_title:
+        by the match class (exact, starts with, contains), then stations go
+        before settlements, then by title. If nothing contains the query,
+        the similar titles are returned instead.
+        """
+        normalized_query = normalize_title(query)
+        if strict_search:
+            start = bisect.bisect_left(self._titles, normalized_query)
+            stop = bisect.bisect_right(self._titles, normalized_query, lo=start)
+            positions: Iterable[int] = range(start, stop)
+        else:
+            positions = self._contains_positions(normalized_query)
+            if not positions:
+                return self.similar(query, limit=limit)
+
+        def rank(position: int) -> tuple[int, bool]:
+            # The titles are stored normalized, so they are not normalized again
+            title = self._titles[position]
+            if title == normalized_query:
+                match_rank = 0
+            elif title.startswith(normalized_query):
+                match_rank = 1
+            else:
+                match_rank = 2
+            return (
+                match_rank,
+                self._points[position].point_type == PointTypeEnum.settlement,
+            )
+
+        # The sort is stable, so the points stay in title order within a rank
+        ranked = sorted(positions, key=rank)[:limit]
+        return [self._points[position] for position in ranked]
+
+
+_point_index: PointSearchIndex | None = None
+_station_grid: StationGrid | None = None
+
+
+def get_point_index() -> PointSearchIndex | None:
+    """Returns the current point index, or None if it has not been loaded."""
+    return _point_index
+
+
+def get_station_grid() -> StationGrid | None:
+    """Returns the current station grid, or None if it has not been loaded."""
+    return _station_grid
+
+
+@log(logger)
+async def load_point_index() -> PointSearchIndex:
+    """Builds the point index and the station grid from the DB.
+
+    Makes them the current ones.
+    """
+    global _point_index, _station_grid
+    start_time = time.perf_counter()
+    points_from_db = await crud_points.get_all_points()
+    points = [
+        PointResponsePD(
+            id=point.id,
+            point_type=point.point_type,
+            title=point.title,
+            yandex_code=point.yandex_code,
+            region_title=point.region.title,
+        )
+        for point in points_from_db
+    ]
+    index = PointSearchIndex(points)
+    grid = StationGrid(
+        (point_from_db.latitude, point_from_db.longitude, point)
+        for point_from_db, point in zip(points_from_db, points)
+        if point.point_type == PointTypeEnum.station
+        and point_from_db.latitude is not None
+        and point_from_db.longitude is not None
+    )
+    _point_index, _station_grid = index, grid
+    logger.info(
+        f"Point index with {len(index)} points and station grid with {len(grid)} "
+        f"stations have been loaded in {time.perf_counter() - start_time:.2f} seconds."
+    )
+    return index
@@ -1,12 +1,53 @@
 import datetime as dt
-import locale
+import functools
 
 from raspbot.core.logging import configure_logging, log
 
 logger = configure_logging(__name__)
 
+# The tables are built into the code so that the dates are rendered the same way
+# regardless of the locales available in the system, and without calling
+# the process-global locale.setlocale.
+WEEKDAYS_IN_ACC_CASE = (
+    "понедельник",
+    "вторник",
+    "среду",
+    "четверг",
+    "пятницу",
+    "субботу",
+    "воскресенье",
+)
+
+MONTHS_IN_GEN_CASE = {
+    1: "января",
+    2: "февраля",
+    3: "марта",
+    4: "апреля",
+    5: "мая",
+    6: "июня",
+    7: "июля",
+    8: "августа",
+    9: "сентября",
+    10: "октября",
+    11: "ноября",
+    12: "декабря",
+}
+
+
+def format_date(date: dt.date) -> str:
+    """Formats the date like strftime("%d %B %Y") in the Russian locale.
+
+    Args:
+        date (dt.date): The date that needs formatting.
+
+    Returns:
+        str: The date, e.g. "05 октября 2026".
+    """
+    return f"{date.day:02d} {MONTHS_IN_GEN_CASE[date.month]} {date.year}"
+
 
 @log(logger)
+@functools.lru_cache(maxsize=512)
 def _get_date_in_words(date: dt.date) -> str:
     """Converts the date object into word representation in Russian.
 
@@ -16,10 +57,19 @@ def _get_date_in_words(date: dt.date) -> str:
     Returns:
         str: The date in words.
     """
-    locale.setlocale(locale.LC_TIME, "ru_RU.UTF-8")
-    week_day = date.strftime("%A").lower().replace("а", "у")
-    word_date = date.strftime("%d %B %Y")
-    return f"{week_day}, {word_date[0].replace('0', '') + word_date[1:]} "
+    week_day = WEEKDAYS_IN_ACC_CASE[date.weekday()]
+    return f"{week_day}, {date.day} {MONTHS_IN_GEN_CASE[date.month]} {date.year} "
+
+
+@functools.lru_cache(maxsize=512)
+def _prettify_day(date: dt.date, today: dt.date) -> str:
+    """Memoized prettify_day: the result only depends on the date and today."""
+    word_date = _get_date_in_words(date=date)
+    if date == today + dt.timedelta(1):
+        return f"завтра, {word_date}"
+    if date == today + dt.timedelta(2):
+        return f"послезавтра, {word_date}"
+    return word_date
 
 
 @log(logger)
@@ -32,12 +82,7 @@ def prettify_day(date: dt.date) -> str:
     Returns:
         str: The prettified date
     """
-    word_date = _get_date_in_words(date=date)
-    if date == dt.date.today() + dt.timedelta(1):
-        return f"завтра, {word_date}"
-    if date == dt.date.today() + dt.timedelta(2):
-        return f"послезавтра, {word_date}"
-    return word_date
+    return _prettify_day(date=date, today=dt.date.today())
 
 
 @log(logger)
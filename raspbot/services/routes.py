@@ -2,10 +2,23 @@ from typing import Sequence
 
 from raspbot.core import exceptions as exc
 from raspbot.core.logging import configure_logging, log
-from raspbot.db.models import PointORM, PointTypeEnum, RouteORM, UserORM
+from raspbot.db.models import PointORM, RouteORM
 from raspbot.db.routes.crud import CRUDPoints, CRUDRoutes
 from raspbot.db.routes.schema import PointResponsePD, RouteResponsePD
+from raspbot.db.users.schema import UserSnapshot
+from raspbot.services.point_cache import (
+    get_cached_point,
+    get_generation,
+    point_cache,
+    point_search_cache,
+)
+from raspbot.services.point_index import (
+    PointSearchIndex,
+    get_point_index,
+    get_station_grid,
+)
 from raspbot.services.shorteners import get_short_point_type
+from raspbot.services.strip import normalize_title
 from raspbot.services.users import add_or_update_recent
 
 logger = configure_logging(name=__name__)
@@ -35,46 +48,6 @@ class PointSelector:
             return True
         return False
 
-    @log(logger)
-    def _normalize_choice_title(self, choice_title: str) -> str:
-        return choice_title.replace("Ё", "Е").replace("ё", "е").lower()
-
-    @log(logger)
-    def _sort_choices(self, pretty_user_input: str) -> list[PointResponsePD]:
-        exact = []
-        startwith = []
-        contain = []
-        for choice in self.choices:
-            choice_title = self._normalize_choice_title(choice.title)
-            logger.debug(f"Choice title: {choice.title}.")
-            if choice_title == pretty_user_input:
-                exact.append(choice)
-                logger.debug(f"Choice {choice.title} appended to exact.")
-            elif choice_title.startswith(pretty_user_input):
-                startwith.append(choice)
-                logger.debug(f"Choice {choice.title} appended to startwith.")
-            elif pretty_user_input in choice_title:
-                contain.append(choice)
-                logger.debug(f"Choice {choice.title} appended to contain.")
-            else:
-                logger.error(
-                    f"Choice {choice.title} does not fall into any of the predefined "
-                    "categories. Something needs to be done about that."
-                )
-            logger.debug(
-                f"Exact: {len(exact)}, startwith: {len(startwith)}, "
-                f"contain: {len(contain)}, total: {len(exact + startwith + contain)}"
-            )
-
-        for choice_list in (exact, startwith, contain):
-
-            def custom_sort_key(point: PointResponsePD):
-                return point.point_type == PointTypeEnum.settlement
-
-            choice_list.sort(key=custom_sort_key)
-
-        return (exact + startwith + contain)[:50]
-
     @log(logger)
     def _split_choice_list(
         self, choice_list: list[PointResponsePD], chunk_size: int = 10
@@ -107,25 +80,73 @@ class PointSelector:
         points_from_db: Sequence[PointORM] = await crud_points.get_points_by_title(
             title=pretty_user_input, strict_search=strict_search
         )
+        if not points_from_db and not strict_search:
+            logger.info(
+                f"Nothing found for {pretty_user_input}, looking for similar titles."
+            )
+            points_from_db = await crud_points.get_similar_points_by_title(
+                title=pretty_user_input
+            )
         return points_from_db
 
+    @log(logger)
+    def _get_points_from_index(
+        self, pretty_user_input: str, point_index: PointSearchIndex
+    ) -> list[PointResponsePD]:
+        strict_search: bool = self._validate_user_input(
+            pretty_user_input=pretty_user_input
+        )
+        return point_index.search(query=pretty_user_input, strict_search=strict_search)
+
     @log(logger)
     async def select_points(
         self, raw_user_input: str
     ) -> list[list[PointResponsePD]] | None:
-        """Selects points."""
+        """Selects points.
+
+        The points are looked up in the in-memory point index,
+        or in the DB if the index has not been loaded.
+        """
         pretty_user_input: str = self._prettify(raw_user_input=raw_user_input)
-        points_from_db = await self._get_points_from_db(
-            pretty_user_input=pretty_user_input,
-        )
-        if not points_from_db:
+        cache_key = normalize_title(pretty_user_input)
+        generation = get_generation()
+        if cache_key in point_search_cache:
+            logger.debug(f"Point search results for {cache_key} are cached.")
+            return point_search_cache.get(cache_key)
+
+        point_index = get_point_index()
+        if point_index:
+            self.choices = self._get_points_from_index(
+                pretty_user_input=pretty_user_input, point_index=point_index
+            )
+        else:
+            points_from_db = await self._get_points_from_db(
+                pretty_user_input=pretty_user_input,
+            )
+            self._add_point_to_choices(points_from_db=points_from_db)
+        if not self.choices:
+            point_search_cache.put(cache_key, None, generation)
             return None
-        self._add_point_to_choices(points_from_db=points_from_db)
         logger.info(f"Number of points: {len(self.choices)}")
-        sorted_choices: list[PointResponsePD] = self._sort_choices(
-            pretty_user_input=pretty_user_input
-        )
-        return self._split_choice_list(choice_list=sorted_choices)
+        # The choices are already ranked by the index or by the DB query
+        point_chunks = self._split_choice_list(choice_list=self.choices)
+        point_search_cache.put(cache_key, point_chunks, generation)
+        return point_chunks
+
+    @log(logger)
+    def select_nearest_stations(
+        self, latitude: float, longitude: float
+    ) -> list[PointResponsePD] | None:
+        """Selects the stations nearest to the location, nearest first."""
+        station_grid = get_station_grid()
+        if station_grid is None:
+            logger.warning(
+                "Station grid has not been loaded, nearest stations cannot be found."
+            )
+            return None
+        nearest = station_grid.nearest(latitude=latitude, longitude=longitude)
+        logger.info(f"Number of stations near {latitude}, {longitude}: {len(nearest)}")
+        return [point for point, _ in nearest] or None
 
 
 class PointRetriever:
@@ -137,7 +158,11 @@ class PointRetriever:
 
     @log(logger)
     async def get_point(self, point_id: int) -> PointResponsePD:
-        """Get point from db by id."""
+        """Get point by id from the point caches, or from db on a cache miss."""
+        generation = get_generation()
+        cached_point = get_cached_point(point_id=point_id)
+        if cached_point is not None:
+            return cached_point
         point_from_db: PointORM = await self._get_point_from_db(point_id=point_id)
         if not point_from_db.yandex_code:
             raise exc.InvalidValueError(
@@ -150,6 +175,7 @@ class PointRetriever:
             yandex_code=point_from_db.yandex_code,
             region_title=point_from_db.region.title,
         )
+        point_cache.put(point, generation)
         return point
 
 
@@ -161,34 +187,24 @@ class RouteFinder:
         self,
         departure_point: PointResponsePD,
         destination_point: PointResponsePD,
-        user: UserORM,
+        user: UserSnapshot,
     ) -> RouteResponsePD:
-        """Gets route by departure and destination points or creates a new one."""
+        """Gets route by departure and destination points or creates a new one.
+
+        Also adds the route to the user recents. Both are upserts,
+        so this costs two statements whether the route is new or not.
+        """
         dep_st_or_stl = get_short_point_type(point_type=departure_point.point_type)
         dest_st_or_stl = get_short_point_type(point_type=destination_point.point_type)
 
-        try:
-            route_from_db: RouteORM = await crud_routes.get_route_by_points(
-                departure_point_id=departure_point.id,
-                destination_point_id=destination_point.id,
-            )
-            logger.info(
-                f"Route from {dep_st_or_stl} {departure_point.title} to "
-                f"{dest_st_or_stl} {destination_point.title} already exists."
-            )
-        except exc.NoDBObjectError:
-            logger.info(
-                f"Route from {dep_st_or_stl} {departure_point.title} to "
-                f"{dest_st_or_stl} {destination_point.title} does not exist yet. "
-                "Creating new route."
-            )
-            instance = RouteORM(
-                departure_point_id=departure_point.id,
-                destination_point_id=destination_point.id,
-            )
-            route_from_db: RouteORM = await crud_routes.create(  # type: ignore
-                instance=instance
-            )
+        route_from_db: RouteORM = await crud_routes.upsert_route(
+            departure_point_id=departure_point.id,
+            destination_point_id=destination_point.id,
+        )
+        logger.info(
+            f"Route from {dep_st_or_stl} {departure_point.title} to "
+            f"{dest_st_or_stl} {destination_point.title} has ID {route_from_db.id}."
+        )
 
         # Add a route to user's recents (or update the updated_at)
         await add_or_update_recent(user_id=user.id, route_id=route_from_db.id)
@@ -1,5 +1,5 @@
 from raspbot.core.logging import configure_logging, log
-from raspbot.db.models import PointTypeEnum
+from raspbot.db.stations.models import PointTypeEnum
 
 logger = configure_logging(__name__)
 
@@ -1,4 +1,5 @@
 import re
+import unicodedata
 
 
 def clean_text(text: str) -> str:
@@ -8,3 +9,13 @@ def clean_text(text: str) -> str:
     cleaned_text = cleaned_text.strip()
 
     return cleaned_text
+
+
+def normalize_title(title: str) -> str:
+    """Normalizes a point title or a search query for comparison.
+
+    Lower-cases the text, replaces ё with е and removes diacritics
+    (so й becomes и), which is roughly what the DB search_title does.
+    """
+    decomposed = unicodedata.normalize("NFD", title.lower().replace("ё", "е"))
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
@@ -0,0 +1,76 @@
+"""Cache of the users by Telegram ID.
+
+Almost every update needs the user from the DB. The users only change
+on the first contact, so they are kept in memory for USER_CACHE_TTL_SECONDS.
+"""
+
+import time
+from collections import OrderedDict
+
+from aiogram.types.user import User as TgUser
+
+from raspbot.core.logging import configure_logging, log
+from raspbot.db.users.schema import UserSnapshot
+from raspbot.services.users import get_or_create_user
+from raspbot.settings import settings
+
+logger = configure_logging(name=__name__)
+
+
+class UserCache:
+    """LRU cache of the users by Telegram ID with the entries expiring after ttl."""
+
+    def __init__(
+        self,
+        ttl: float = settings.USER_CACHE_TTL_SECONDS,
+        maxsize: int = settings.USER_CACHE_SIZE,
+    ):
+        """Initializes UserCache class instance."""
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._users: OrderedDict[int, tuple[float, UserSnapshot]] = OrderedDict()
+
+    def get(self, telegram_id: int) -> UserSnapshot | None:
+        """Gets the cached user, or None if it is not cached or has expired."""
+        entry = self._users.get(telegram_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._users[telegram_id]
+            return None
+        self._users.move_to_end(telegram_id)
+        return user
+
+    def put(self, user: UserSnapshot) -> None:
+        """Caches the user, evicting the least recently used."""
+        self._users[user.telegram_id] = (time.monotonic() + self._ttl, user)
+        self._users.move_to_end(user.telegram_id)
+        if len(self._users) > self._maxsize:
+            self._users.popitem(last=False)
+
+
+user_cache = UserCache()
+
+
+@log(logger)
+async def resolve_user(tg_user: TgUser) -> tuple[UserSnapshot, bool]:
+    """Gets the user from the cache or the DB, creates it on first contact.
+
+    Returns the user and whether it has been created.
+    """
+    user = user_cache.get(tg_user.id)
+    if user is not None:
+        return user, False
+    user_from_db, created = await get_or_create_user(tg_user=tg_user)
+    user = UserSnapshot(
+        id=user_from_db.id,
+        telegram_id=user_from_db.telegram_id,
+        first_name=user_from_db.first_name,
+        last_name=user_from_db.last_name,
+    )
+    # The new user is only committed with the rest of the update, which may
+    # still fail and roll it back, so it is cached on the next update
+    if not created:
+        user_cache.put(user)
+    return user, created
@@ -35,8 +35,18 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     DB_HOST: str
     DB_PORT: str
+    DB_REPLICA_HOST: str = ""
+    DB_REPLICA_PORT: str = ""
     LC_COLLATE: str = "ru_RU.UTF-8"
     LC_CTYPE: str = "ru_RU.UTF-8"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    DB_SLOW_QUERY_SECONDS: float = 0.5
+    DB_STATEMENTS_PER_UPDATE_BUDGET: int = 6
 
     # Email
     EMAIL_FROM: str
@@ -49,6 +59,17 @@ class Settings(BaseSettings):
     # Telegram API
     MAX_TG_MSG_LENGTH: int = 4096
 
+    # Point search
+    POINT_SEARCH_LIMIT: int = 30
+    POINT_SEARCH_CACHE_SIZE: int = 1024
+    POINT_CACHE_SIZE: int = 4096
+    NEAREST_STATIONS_LIMIT: int = 8
+    NEAREST_STATIONS_MAX_DISTANCE_KM: float = 10.0
+
+    # Users
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_SIZE: int = 10000
+
     # Timetables
     CLOSEST_DEP_LIMIT: int = 12
     DEP_FORMAT: str = "%H:%M"
@@ -60,6 +81,8 @@ class Settings(BaseSettings):
     MAX_DAYS_INTO_PAST: int = 0
     MAX_MONTHS_INTO_FUTURE: int = 11
     DAYS_BETWEEN_STATIONS_DB_UPDATE: int = 14
+    STATION_DATA_CHECK_INTERVAL_MINUTES: int = 10
+    STATIONS_MAX_SOFT_DELETED_SHARE: float = 0.1
 
     # Logging
     LOG_FORMAT: str = (
@@ -72,6 +95,7 @@ class Settings(BaseSettings):
     LOG_FILE: str | Path = Path(LOG_DIR, "raspbot.log")
     LOG_FILE_SIZE: int = 10 * 2**20
     LOG_FILES_TO_KEEP: int = 5
+    METRICS_LOG_INTERVAL_MINUTES: int = 15
 
     @property
     def headers(self) -> dict[str, str | bytes | None]:
@@ -87,6 +111,18 @@ class Settings(BaseSettings):
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.POSTGRES_DB}"
         )
 
+    @property
+    def replica_database_url(self) -> str | None:
+        """Get a link for connecting to the read replica DB, if there is one."""
+        if not self.DB_REPLICA_HOST:
+            return None
+        return (
+            "postgresql+asyncpg://"
+            f"{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.DB_REPLICA_HOST}:{self.DB_REPLICA_PORT or self.DB_PORT}"
+            f"/{self.POSTGRES_DB}"
+        )
+
     class Config:
         """Settings config."""
 
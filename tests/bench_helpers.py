@@ -0,0 +1,15 @@
+"""Helpers for the opt-in benchmarks.
+
+The timings depend on the machine, so the benchmarks only print them
+and only run with RUN_BENCHMARKS set, e.g.:
+
+    RUN_BENCHMARKS=1 python -m pytest tests -s -k benchmark
+"""
+
+import os
+
+import pytest
+
+benchmark = pytest.mark.skipif(
+    not os.environ.get("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS is not set"
+)
@@ -0,0 +1,79 @@
+"""Helpers for feeding the updates through the dispatcher without Telegram."""
+
+import datetime as dt
+from itertools import count
+from typing import Any
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import SendMessage, TelegramMethod
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from raspbot.bot.middlewares import CommitScopeRequestMiddleware
+from raspbot.settings import settings
+
+TG_USER = User(id=1, is_bot=False, first_name="Тест")
+CHAT = Chat(id=1, type="private")
+
+_update_ids = count(1)
+
+
+class StubSession(BaseSession):
+    """Bot API session answering every request without sending it.
+
+    The requests are kept in the requests list.
+    """
+
+    def __init__(self):
+        """Initializes StubSession class instance."""
+        super().__init__()
+        self.requests: list[TelegramMethod[Any]] = []
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: int | None = None
+    ) -> Any:
+        self.requests.append(method)
+        if isinstance(method, SendMessage):
+            return get_message(text=method.text)
+        return True
+
+    async def stream_content(self, *args: Any, **kwargs: Any) -> Any:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+def get_stub_bot() -> tuple[Bot, StubSession]:
+    """Returns the bot with the stub session, set up as the production one."""
+    session = StubSession()
+    bot = Bot(token=settings.TELEGRAM_TOKEN, session=session)
+    bot.session.middleware(CommitScopeRequestMiddleware())
+    return bot, session
+
+
+def get_message(text: str) -> Message:
+    return Message(
+        message_id=next(_update_ids),
+        date=dt.datetime.now(),
+        chat=CHAT,
+        from_user=TG_USER,
+        text=text,
+    )
+
+
+def get_message_update(text: str) -> Update:
+    return Update(update_id=next(_update_ids), message=get_message(text=text))
+
+
+def get_callback_update(data: str) -> Update:
+    return Update(
+        update_id=next(_update_ids),
+        callback_query=CallbackQuery(
+            id=str(next(_update_ids)),
+            from_user=TG_USER,
+            chat_instance="1",
+            message=get_message(text=""),
+            data=data,
+        ),
+    )
@@ -0,0 +1,224 @@
+"""Helpers for the tests running against the Postgres DB at TEST_DATABASE_URL."""
+
+import asyncio
+import os
+import random
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import pytest
+from sqlalchemy import event, insert
+
+from raspbot.db.base import BaseORM, engine, session_scope
+from raspbot.db.models import (
+    PointORM,
+    PointTypeEnum,
+    RecentORM,
+    RegionORM,
+    RouteORM,
+    UserORM,
+)
+
+requires_postgres = pytest.mark.skipif(
+    not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set"
+)
+
+Statement = tuple[str, Any]
+
+# Enough rows for the planner to prefer the indexes when they help
+SEED_POINTS = 20000
+SEED_ROUTE_POINTS = 500
+SEED_USERS = 2000
+SEED_RECENTS_PER_USER = 5
+
+
+def run_with_db(test: Callable[[], Awaitable[None]]) -> None:
+    """Runs the async test on a freshly created schema.
+
+    The engine is disposed of afterwards, as its connections belong
+    to the event loop of the test.
+    """
+
+    async def run() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(BaseORM.metadata.drop_all)
+            await conn.run_sync(BaseORM.metadata.create_all)
+        try:
+            await test()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+@asynccontextmanager
+async def capture_statements() -> AsyncIterator[list[Statement]]:
+    """Collects the SQL statements sent to the DB, with their parameters."""
+    statements: list[Statement] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+
+def find_statement(statements: list[Statement], fragment: str) -> Statement:
+    """Returns the first captured statement containing the fragment."""
+    for statement in statements:
+        if fragment in statement[0]:
+            return statement
+    raise AssertionError(f"No statement with {fragment!r} in {statements}")
+
+
+async def explain(statement: Statement) -> str:
+    """Returns the plan the planner chooses for the captured statement.
+
+    The tables must be seeded with a realistic number of rows and analyzed
+    first, see seed_points, seed_recents and analyze.
+    """
+    sql, parameters = statement
+    async with engine.connect() as conn:
+        raw_connection = await conn.get_raw_connection()
+        rows = await raw_connection.driver_connection.fetch(  # type: ignore[union-attr]
+            f"EXPLAIN {sql}", *(parameters or ())
+        )
+    return "\n".join(row[0] for row in rows)
+
+
+async def analyze() -> None:
+    """Updates the planner statistics of all the tables."""
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("ANALYZE")
+
+
+def _get_filler_titles(count: int) -> list[str]:
+    """Random point titles, none of them containing the letter м.
+
+    So that they never match the searches of the tests.
+    """
+    letters = "абвгдежзиклнопрстуфхцчшщэюя"
+    rng = random.Random(0)
+    return [
+        " ".join(
+            "".join(rng.choices(letters, k=rng.randint(4, 9)))
+            for _ in range(rng.randint(1, 3))
+        ).capitalize()
+        for _ in range(count)
+    ]
+
+
+async def seed_points(count: int = SEED_POINTS) -> list[int]:
+    """Adds a region with count stations with the filler titles.
+
+    Returns the IDs of the stations.
+    """
+    async with session_scope() as session:
+        region_id = await session.scalar(
+            insert(RegionORM)
+            .values(title="Тверская область", yandex_code="r_seed")
+            .returning(RegionORM.id)
+        )
+        point_ids = await session.scalars(
+            insert(PointORM).returning(PointORM.id),
+            [
+                {
+                    "point_type": PointTypeEnum.station,
+                    "title": title,
+                    "yandex_code": f"s_seed{number}",
+                    "region_id": region_id,
+                }
+                for number, title in enumerate(_get_filler_titles(count))
+            ],
+        )
+        return list(point_ids)
+
+
+async def seed_recents(
+    users: int = SEED_USERS, recents_per_user: int = SEED_RECENTS_PER_USER
+) -> None:
+    """Adds the users with their recent routes between the seeded points.
+
+    A quarter of the recents are in favorites.
+    """
+    point_ids = await seed_points(count=SEED_ROUTE_POINTS)
+    rng = random.Random(0)
+    async with session_scope() as session:
+        pairs = list(zip(point_ids, point_ids[1:] + point_ids[:1]))
+        pairs += [(destination, departure) for departure, destination in pairs]
+        route_ids = list(
+            await session.scalars(
+                insert(RouteORM).returning(RouteORM.id),
+                [
+                    {"departure_point_id": departure, "destination_point_id": dest}
+                    for departure, dest in pairs
+                ],
+            )
+        )
+        user_ids = list(
+            await session.scalars(
+                insert(UserORM).returning(UserORM.id),
+                [
+                    {
+                        "telegram_id": 1000 + number,
+                        "first_name": f"Пользователь {number}",
+                    }
+                    for number in range(users)
+                ],
+            )
+        )
+        await session.execute(
+            insert(RecentORM),
+            [
+                {
+                    "user_id": user_id,
+                    "route_id": route_id,
+                    "count": rng.randint(1, 50),
+                    "favorite": rng.random() < 0.25,
+                }
+                for user_id in user_ids
+                for route_id in rng.sample(route_ids, recents_per_user)
+            ],
+        )
+
+
+async def add_points(titles: list[str]) -> list[PointORM]:
+    """Adds a region with a station for every title."""
+    async with session_scope() as session:
+        region = RegionORM(title="Московская область", yandex_code="r1")
+        points = [
+            PointORM(
+                point_type=PointTypeEnum.station,
+                title=title,
+                yandex_code=f"s{number}",
+                region=region,
+            )
+            for number, title in enumerate(titles)
+        ]
+        session.add_all(points)
+    return points
+
+
+async def add_recents(points: list[PointORM], favorites: int = 0) -> int:
+    """Adds a user with a recent route between every two consecutive points.
+
+    The first favorites of the recents are in favorites. Returns the user ID.
+    """
+    async with session_scope() as session:
+        user = UserORM(telegram_id=1, first_name="Тест")
+        routes = [
+            RouteORM(
+                departure_point_id=departure.id, destination_point_id=destination.id
+            )
+            for departure, destination in zip(points, points[1:])
+        ]
+        session.add_all(
+            RecentORM(
+                user=user, route=route, count=number + 1, favorite=number < favorites
+            )
+            for number, route in enumerate(routes)
+        )
+    return user.id
@@ -0,0 +1,22 @@
+"""In-process metrics registry."""
+
+from raspbot.core.metrics import MetricsRegistry
+
+
+def test_metrics_are_created_once_and_reused():
+    registry = MetricsRegistry()
+    counter = registry.counter("db.slow_statements")
+    histogram = registry.histogram("db.statement_seconds")
+    assert registry.counter("db.slow_statements") is counter
+    assert registry.histogram("db.statement_seconds") is histogram
+
+
+def test_snapshot_has_all_the_metrics():
+    registry = MetricsRegistry()
+    registry.counter("api.request_errors").inc(2)
+    registry.gauge("db.pool.checked_out", lambda: 3)
+    registry.histogram("api.request_seconds").observe(0.2)
+    snapshot = registry.snapshot()
+    assert snapshot["api.request_errors"] == 2
+    assert snapshot["db.pool.checked_out"] == 3
+    assert snapshot["api.request_seconds"]["count"] == 1
@@ -0,0 +1,74 @@
+"""Update middlewares."""
+
+import asyncio
+
+import pytest
+from aiogram import Dispatcher, Router
+from aiogram.methods import SendMessage
+from aiogram.types import Message
+from bot_helpers import get_callback_update, get_message_update, get_stub_bot
+from sqlalchemy.exc import OperationalError
+
+from raspbot.bot import middlewares
+from raspbot.bot.constants import callback as clb
+from raspbot.bot.constants import messages as msg
+
+
+def _get_dispatcher(handled: list[Message]) -> Dispatcher:
+    """Dispatcher with the production middlewares and a single handler."""
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message) -> None:
+        handled.append(message)
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(middlewares.DBSessionMiddleware())
+    dp.update.outer_middleware(middlewares.UserMiddleware())
+    dp.include_router(router)
+    return dp
+
+
+def test_user_resolution_error_is_answered_and_reported(monkeypatch):
+    error = OperationalError("SELECT", {}, Exception("connection refused"))
+    emailed: list[Exception] = []
+
+    async def resolve_user(tg_user):
+        raise error
+
+    async def send_email_async(e):
+        emailed.append(e)
+
+    monkeypatch.setattr(middlewares, "resolve_user", resolve_user)
+    monkeypatch.setattr(middlewares, "send_email_async", send_email_async)
+    handled: list[Message] = []
+    dp = _get_dispatcher(handled)
+    bot, session = get_stub_bot()
+
+    with pytest.raises(OperationalError):
+        asyncio.run(dp.feed_update(bot, get_message_update("/recent")))
+
+    assert not handled
+    assert emailed == [error]
+    assert [
+        request.text for request in session.requests if isinstance(request, SendMessage)
+    ] == [msg.ERROR]
+
+
+@pytest.mark.parametrize(
+    "update, flow",
+    [
+        (get_message_update("/recent"), "/recent"),
+        (get_message_update("/start@raspbot payload"), "/start"),
+        (get_message_update("Москва"), "message"),
+        (get_message_update("/anything"), middlewares.OTHER_FLOW),
+        (get_callback_update(clb.NEW_SEARCH), clb.NEW_SEARCH),
+        (
+            get_callback_update(clb.RouteToFavCallbackFactory(route_id=1).pack()),
+            "route_to_fav",
+        ),
+        (get_callback_update("anything:1"), middlewares.OTHER_FLOW),
+    ],
+)
+def test_flows_are_only_the_known_ones(update, flow):
+    assert middlewares.get_flow(update) == flow
@@ -0,0 +1,47 @@
+"""Nearest station search over the station grid."""
+
+import pytest
+
+from raspbot.db.models import PointTypeEnum
+from raspbot.db.routes.schema import PointResponsePD
+from raspbot.services.nearest_points import StationGrid, get_distance_km
+
+
+def _get_station(point_id: int) -> PointResponsePD:
+    return PointResponsePD(
+        id=point_id,
+        point_type=PointTypeEnum.station,
+        title=f"Станция {point_id}",
+        yandex_code=f"s{point_id}",
+        region_title="Чукотский автономный округ",
+    )
+
+
+def test_nearest_stations_are_sorted_by_distance():
+    grid = StationGrid(
+        [
+            (55.76, 37.66, _get_station(1)),
+            (55.75, 37.62, _get_station(2)),
+            (55.78, 37.58, _get_station(3)),
+            (56.85, 35.90, _get_station(4)),
+        ]
+    )
+    nearest = grid.nearest(55.75, 37.62, limit=3, max_distance_km=20)
+    assert [point.id for point, _ in nearest] == [2, 1, 3]
+    assert nearest[0][1] == pytest.approx(0, abs=0.01)
+
+
+@pytest.mark.parametrize(
+    "latitude, longitude, station_longitude",
+    [(65.0, 179.999, -179.99), (65.0, -179.999, 179.99)],
+)
+def test_nearest_stations_across_antimeridian(
+    latitude: float, longitude: float, station_longitude: float
+):
+    grid = StationGrid([(latitude, station_longitude, _get_station(1))])
+    nearest = grid.nearest(latitude, longitude, limit=1, max_distance_km=5)
+    assert [point.id for point, _ in nearest] == [1]
+    assert nearest[0][1] == pytest.approx(
+        get_distance_km(latitude, longitude, latitude, station_longitude)
+    )
+    assert nearest[0][1] < 1
@@ -0,0 +1,128 @@
+"""Correctness, parity check and benchmark of the date grammar fast path.
+
+The fast path must resolve the corpus of typical user date inputs the same
+way as the previous pipeline: the specific words, the bare number
+and the dateutil fallback. The weekdays, which the previous pipeline
+did not resolve on its own, are checked against the expected dates.
+
+Run the benchmark with: RUN_BENCHMARKS=1 python -m pytest tests/test_other_date.py -s
+"""
+
+import datetime as dt
+import time
+
+import pytest
+from bench_helpers import benchmark
+from dateutil.relativedelta import relativedelta
+
+from raspbot.core import exceptions as exc
+from raspbot.services import other_date
+
+BENCHMARK_ROUNDS = 200
+
+
+def _get_corpus(today: dt.date) -> list[str]:
+    """Typical user date inputs, built around today so that they stay valid."""
+    soon = today + dt.timedelta(days=10)
+    later = today + relativedelta(months=1, days=3)
+    month_names = {
+        1: "января",
+        2: "февраля",
+        3: "марта",
+        4: "апреля",
+        5: "мая",
+        6: "июня",
+        7: "июля",
+        8: "августа",
+        9: "сентября",
+        10: "октября",
+        11: "ноября",
+        12: "декабря",
+    }
+    corpus = ["сегодня", "завтра", "послезавтра", "вчера"]
+    for date in (soon, later):
+        corpus += [
+            f"{date.day}.{date.month}",
+            f"{date.day:02}.{date.month:02}",
+            f"{date.day}/{date.month}",
+            f"{date.day}-{date.month}",
+            f"{date.day:02}.{date.month:02}.{date.year}",
+            f"{date.day:02}.{date.month:02}.{date.year % 100:02}",
+            f"{date.year}.{date.month:02}.{date.day:02}",
+            f"{date.year}-{date.month:02}-{date.day:02}",
+            f"{date.day} {month_names[date.month]}",
+            f"{date.day} {month_names[date.month]} {date.year}",
+        ]
+    return corpus
+
+
+def _resolve(func, user_input: str) -> dt.date | type[Exception] | None:
+    """Returns the date, or the class of the user input error."""
+    try:
+        return func(user_input)
+    except exc.InvalidDateUserInputError as e:
+        return type(e)
+
+
+def _resolve_with_previous_pipeline(user_input: str) -> dt.date | None:
+    """The pipeline used before the fast path, dateutil as the last resort."""
+    return (
+        other_date._check_specific_words(user_input)
+        or other_date._check_number(user_input)
+        or other_date._parse_date(other_date._replace_symbols_with_slashes(user_input))
+    )
+
+
+@pytest.mark.parametrize("user_input", _get_corpus(dt.date.today()))
+def test_fast_path_matches_previous_pipeline(user_input: str):
+    fast = _resolve(other_date._match_date_grammar, user_input)
+    assert fast is not None, f"{user_input!r} is not covered by the fast path"
+    assert fast == _resolve(_resolve_with_previous_pipeline, user_input)
+
+
+def _get_weekday_cases(today: dt.date) -> list[tuple[str, dt.date]]:
+    """Weekday inputs with the dates they stand for."""
+    this_week = today - dt.timedelta(days=today.weekday())
+    next_week = this_week + dt.timedelta(days=7)
+
+    def upcoming(weekday: int) -> dt.date:
+        return today + dt.timedelta(days=(weekday - today.weekday()) % 7)
+
+    return [
+        ("в пятницу", upcoming(4)),
+        ("пятница", upcoming(4)),
+        ("пт", upcoming(4)),
+        ("вс", upcoming(6)),
+        ("в воскресенье", upcoming(6)),
+        ("во вторник", upcoming(1)),
+        ("в среду", upcoming(2)),
+        ("на субботу", upcoming(5)),
+        ("Понедельник", upcoming(0)),
+        ("в следующий вторник", next_week + dt.timedelta(days=1)),
+        ("в следующую пятницу", next_week + dt.timedelta(days=4)),
+        ("в следующее воскресенье", next_week + dt.timedelta(days=6)),
+        ("следующий понедельник", next_week),
+    ]
+
+
+@pytest.mark.parametrize("user_input, expected", _get_weekday_cases(dt.date.today()))
+def test_fast_path_resolves_weekdays(user_input: str, expected: dt.date):
+    assert other_date._match_date_grammar(user_input) == expected
+
+
+@benchmark
+def test_benchmark_fast_path_against_previous_pipeline():
+    corpus = _get_corpus(dt.date.today())
+    timings = {}
+    for name, func in (
+        ("fast path", other_date._match_date_grammar),
+        ("previous pipeline", _resolve_with_previous_pipeline),
+    ):
+        start_time = time.perf_counter()
+        for _ in range(BENCHMARK_ROUNDS):
+            for user_input in corpus:
+                _resolve(func, user_input)
+        timings[name] = time.perf_counter() - start_time
+    calls = BENCHMARK_ROUNDS * len(corpus)
+    for name, seconds in timings.items():
+        print(f"{name}: {seconds / calls * 1e6:.1f} µs per input")
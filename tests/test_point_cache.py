@@ -0,0 +1,33 @@
+"""Refresh of the point caches after the stations DB populations."""
+
+import asyncio
+
+from raspbot.services import point_cache
+
+
+def test_watch_refreshes_only_on_generation_change(monkeypatch):
+    generations = iter([1, 1, 2])
+    refreshes: list[int] = []
+
+    async def get_latest_id() -> int:
+        try:
+            return next(generations)
+        except StopIteration:
+            raise asyncio.CancelledError
+
+    async def refresh_point_caches() -> None:
+        refreshes.append(point_cache.get_generation())
+        point_cache.set_generation(2)
+
+    monkeypatch.setattr(point_cache.crud_last_updated, "get_latest_id", get_latest_id)
+    monkeypatch.setattr(point_cache, "refresh_point_caches", refresh_point_caches)
+    monkeypatch.setattr(point_cache, "_generation", 1)
+
+    async def test():
+        try:
+            await point_cache.watch_station_data_generation(interval_minutes=0)
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(test())
+    assert refreshes == [1]
@@ -0,0 +1,53 @@
+"""EXPLAIN checks of the point title search.
+
+The points table is seeded with thousands of stations and analyzed,
+so the plans are the ones the planner chooses for a realistic table.
+"""
+
+from pg_helpers import (
+    add_points,
+    analyze,
+    capture_statements,
+    explain,
+    find_statement,
+    requires_postgres,
+    run_with_db,
+    seed_points,
+)
+
+from raspbot.db.base import session_scope
+from raspbot.db.routes.crud import CRUDPoints
+
+
+@requires_postgres
+def test_title_search_uses_trigram_index():
+    async def test():
+        await add_points(["Москва Курская", "Подмосковная", "Тула"])
+        await seed_points()
+        await analyze()
+        async with session_scope():
+            async with capture_statements() as statements:
+                points = await CRUDPoints().get_points_by_title("моск")
+        assert {point.title for point in points} == {"Москва Курская", "Подмосковная"}
+        plan = await explain(find_statement(statements, "search_title"))
+        assert "ix_points_search_title_trgm" in plan, plan
+
+    run_with_db(test)
+
+
+@requires_postgres
+def test_strict_title_search_uses_trigram_index():
+    async def test():
+        await add_points(["Москва Курская", "Тула"])
+        await seed_points()
+        await analyze()
+        async with session_scope():
+            async with capture_statements() as statements:
+                points = await CRUDPoints().get_points_by_title(
+                    "москва курская", strict_search=True
+                )
+        assert [point.title for point in points] == ["Москва Курская"]
+        plan = await explain(find_statement(statements, "search_title"))
+        assert "ix_points_search_title_trgm" in plan, plan
+
+    run_with_db(test)
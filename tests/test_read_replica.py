@@ -0,0 +1,60 @@
+"""Routing of the CRUD reads between the primary and the read replica."""
+
+import asyncio
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from raspbot.db import base
+from raspbot.db.routes.crud import CRUDPoints
+from raspbot.db.users.crud import CRUDRecents
+
+
+class _EmptyResult:
+    """Result of a query with no rows."""
+
+    def scalars(self) -> "_EmptyResult":
+        return self
+
+    def unique(self) -> "_EmptyResult":
+        return self
+
+    def first(self) -> None:
+        return None
+
+    def all(self) -> list:
+        return []
+
+
+def test_user_scoped_reads_skip_the_replica(monkeypatch):
+    executed: list[str] = []
+
+    class ReadSession:
+        bind = None
+
+        async def execute(self, *args: Any, **kwargs: Any) -> _EmptyResult:
+            executed.append("replica")
+            return _EmptyResult()
+
+        def in_transaction(self) -> bool:
+            return False
+
+        async def close(self) -> None:
+            pass
+
+    async def execute(self, *args: Any, **kwargs: Any) -> _EmptyResult:
+        executed.append("primary")
+        return _EmptyResult()
+
+    monkeypatch.setattr(base, "async_read_session_factory", ReadSession)
+    monkeypatch.setattr(AsyncSession, "execute", execute)
+
+    async def test():
+        async with base.session_scope():
+            await CRUDPoints().get_all_points()
+            assert executed == ["replica"]
+            # The recent may have been upserted by the previous update of the user
+            await CRUDRecents().route_in_recent(user_id=1, route_id=1)
+            assert executed == ["replica", "primary"]
+
+    asyncio.run(test())
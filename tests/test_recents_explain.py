@@ -0,0 +1,85 @@
+"""EXPLAIN checks of the recents listings and of the routes by destination.
+
+The tables are seeded with thousands of users and their recents and analyzed,
+so the plans are the ones the planner chooses for realistic tables.
+"""
+
+from pg_helpers import (
+    add_points,
+    add_recents,
+    analyze,
+    capture_statements,
+    explain,
+    find_statement,
+    requires_postgres,
+    run_with_db,
+    seed_recents,
+)
+
+from raspbot.db.base import session_scope
+from raspbot.db.users.crud import CRUDRecents
+
+
+@requires_postgres
+def test_recents_listing_uses_recents_index():
+    async def test():
+        points = await add_points(["Москва", "Тула", "Калуга", "Тверь"])
+        user_id = await add_recents(points, favorites=1)
+        await seed_recents()
+        await analyze()
+        async with session_scope():
+            async with capture_statements() as statements:
+                recents = await CRUDRecents().get_recent_or_fav_by_user_id(user_id)
+        assert [recent.destination_title for recent in recents] == [
+            "Тверь",
+            "Калуга",
+            "Тула",
+        ]
+        plan = await explain(find_statement(statements, "FROM recents"))
+        assert "ix_recents_user_id_count_updated_at" in plan, plan
+
+    run_with_db(test)
+
+
+@requires_postgres
+def test_favorites_listing_uses_favorite_recents_index():
+    async def test():
+        points = await add_points(["Москва", "Тула", "Калуга", "Тверь"])
+        user_id = await add_recents(points, favorites=2)
+        await seed_recents()
+        await analyze()
+        async with session_scope():
+            async with capture_statements() as statements:
+                favorites = await CRUDRecents().get_recent_or_fav_by_user_id(
+                    user_id, fav=True
+                )
+                not_favorites = await CRUDRecents().get_recent_not_in_fav_by_user_id(
+                    user_id
+                )
+        assert [favorite.destination_title for favorite in favorites] == [
+            "Калуга",
+            "Тула",
+        ]
+        assert [recent.destination_title for recent in not_favorites] == ["Тверь"]
+        for statement in statements:
+            plan = await explain(statement)
+            assert "ix_recents_user_id_favorite_count_updated_at" in plan, plan
+
+    run_with_db(test)
+
+
+@requires_postgres
+def test_routes_by_destination_use_destination_index():
+    """The lookup run by the routes foreign key check when a point is deleted."""
+
+    async def test():
+        points = await add_points(["Москва", "Тула", "Калуга"])
+        await add_recents(points)
+        await seed_recents()
+        await analyze()
+        plan = await explain(
+            ("SELECT id FROM routes WHERE destination_point_id = $1", (points[1].id,))
+        )
+        assert "ix_routes_destination_point_id" in plan, plan
+
+    run_with_db(test)
@@ -0,0 +1,81 @@
+"""Parity check and benchmark of the recents listing Core select.
+
+The Core select must list the same routes as the previous ORM query,
+which loaded the recents with the joined route and both route points.
+
+Run the benchmark with:
+RUN_BENCHMARKS=1 python -m pytest tests/test_recents_listing_benchmark.py -s
+"""
+
+import time
+
+from bench_helpers import benchmark
+from pg_helpers import add_points, add_recents, requires_postgres, run_with_db
+from sqlalchemy import desc, select
+from sqlalchemy.orm import joinedload
+
+from raspbot.db.base import get_current_session, session_scope
+from raspbot.db.models import RecentORM, RouteORM
+from raspbot.db.users.crud import CRUDRecents
+from raspbot.settings import settings
+
+BENCHMARK_ROUNDS = 200
+RECENTS = 20
+
+
+async def _list_with_previous_orm_query(user_id: int) -> list[str]:
+    """The listing as it was loaded before the Core select."""
+    result = await get_current_session().execute(
+        select(RecentORM)
+        .where(RecentORM.user_id == user_id)
+        .join(RouteORM)
+        .options(joinedload(RecentORM.route).joinedload(RouteORM.departure_point))
+        .options(joinedload(RecentORM.route).joinedload(RouteORM.destination_point))
+        .order_by(desc(RecentORM.count), desc(RecentORM.updated_at))
+        .limit(settings.RECENT_FAV_LIST_LENGTH)
+    )
+    return [str(recent.route) for recent in result.scalars().unique()]
+
+
+async def _list_with_core_select(user_id: int) -> list[str]:
+    """The listing as it is loaded now."""
+    recents = await CRUDRecents().get_recent_or_fav_by_user_id(user_id)
+    return [str(recent) for recent in recents]
+
+
+@requires_postgres
+def test_core_select_lists_like_previous_orm_query():
+    async def test():
+        points = await add_points([f"Станция {number}" for number in range(RECENTS)])
+        user_id = await add_recents(points)
+        async with session_scope():
+            listing = await _list_with_core_select(user_id)
+        async with session_scope():
+            previous_listing = await _list_with_previous_orm_query(user_id)
+        assert len(listing) == settings.RECENT_FAV_LIST_LENGTH
+        assert listing == previous_listing
+
+    run_with_db(test)
+
+
+@benchmark
+@requires_postgres
+def test_benchmark_core_select_against_previous_orm_query():
+    async def test():
+        points = await add_points([f"Станция {number}" for number in range(RECENTS)])
+        user_id = await add_recents(points)
+        timings = {}
+        for name, func in (
+            ("core select", _list_with_core_select),
+            ("previous orm query", _list_with_previous_orm_query),
+        ):
+            # A session per listing, as there is one per update
+            start_time = time.perf_counter()
+            for _ in range(BENCHMARK_ROUNDS):
+                async with session_scope():
+                    await func(user_id)
+            timings[name] = time.perf_counter() - start_time
+        for name, seconds in timings.items():
+            print(f"{name}: {seconds / BENCHMARK_ROUNDS * 1e3:.2f} ms per listing")
+
+    run_with_db(test)
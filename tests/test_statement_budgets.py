@@ -0,0 +1,94 @@
+"""DB statement budgets of the main bot flows.
+
+The updates go through the dispatcher with the production middlewares
+and routers, against the Postgres DB at TEST_DATABASE_URL. Only the Telegram
+Bot API and the Yandex timetable API are stubbed. Every flow must not run
+more statements than its budget, so that the N+1 patterns fail the suite.
+"""
+
+from typing import Any
+
+from bot_helpers import get_callback_update, get_message_update, get_stub_bot
+from pg_helpers import add_points, add_recents, requires_postgres, run_with_db
+
+from raspbot.bot import middlewares
+from raspbot.bot.bot import get_dispatcher
+from raspbot.bot.constants import callback as clb
+from raspbot.services import point_index, timetable, user_cache
+from raspbot.services.point_cache import refresh_point_caches
+
+# The most statements each flow may run, including the user resolution
+FLOW_STATEMENT_BUDGETS = {
+    # The user SELECT on the user cache miss of the first update, the user
+    # is cached from then on
+    "start": 1,
+    # The points are searched in the in-memory point index
+    "new_search": 0,
+    "departure_search": 0,
+    "departure_click": 0,
+    # The single listing select
+    "recent": 1,
+    # The UPDATE ... RETURNING of the recent with its route and both points,
+    # then the favorite check for the timetable keyboard
+    "open_recent": 2,
+    # The recent of the route, the favorite UPDATE and the reload of the recent
+    # with its route and both points
+    "add_to_fav": 3,
+}
+
+
+async def _search_between_stations(*args: Any, **kwargs: Any) -> dict:
+    """Yandex timetable API answer with no departures."""
+    return {"segments": [], "pagination": {"total": 0, "limit": 100, "offset": 0}}
+
+
+@requires_postgres
+def test_flows_stay_within_statement_budgets(monkeypatch):
+    statement_counts: list[int] = []
+
+    def record_statement_count(event: Any, statements: int) -> None:
+        statement_counts.append(statements)
+
+    monkeypatch.setattr(
+        middlewares.DBSessionMiddleware,
+        "_record_statement_count",
+        staticmethod(record_statement_count),
+    )
+    monkeypatch.setattr(timetable, "search_between_stations", _search_between_stations)
+    monkeypatch.setattr(user_cache, "user_cache", user_cache.UserCache())
+    monkeypatch.setattr(point_index, "_point_index", None)
+    monkeypatch.setattr(point_index, "_station_grid", None)
+
+    async def test():
+        points = await add_points(["Москва Курская", "Москва Рижская", "Тула"])
+        await add_recents(points)
+        await refresh_point_caches()
+        dispatcher = get_dispatcher()
+        bot, _ = get_stub_bot()
+        flows = {
+            "start": get_message_update("/start"),
+            "new_search": get_message_update("/search"),
+            "departure_search": get_message_update("Москва"),
+            "departure_click": get_callback_update(
+                clb.PointsCallbackFactory(
+                    is_departure=True, point_id=points[0].id
+                ).pack()
+            ),
+            "recent": get_message_update("/recent"),
+            "open_recent": get_callback_update(
+                clb.GetTimetableCallbackFactory(recent_id=1).pack()
+            ),
+            "add_to_fav": get_callback_update(
+                clb.RouteToFavCallbackFactory(route_id=1).pack()
+            ),
+        }
+        for flow, update in flows.items():
+            statement_counts.clear()
+            await dispatcher.feed_update(bot, update)
+            assert len(statement_counts) == 1, flow
+            assert statement_counts[0] <= FLOW_STATEMENT_BUDGETS[flow], (
+                f"Flow {flow} has run {statement_counts[0]} statements, "
+                f"over the budget of {FLOW_STATEMENT_BUDGETS[flow]}."
+            )
+
+    run_with_db(test)